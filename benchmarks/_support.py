@@ -0,0 +1,79 @@
+import asyncio
+from types import SimpleNamespace
+
+from discord import Guild
+from discord.ext import commands
+
+import slash_commands
+
+APPLICATION_ID = 1
+GUILD_ID = 5
+CHANNEL_ID = 2
+USER_ID = 3
+
+
+class StandInHTTP:
+    def __init__(self):
+        self.requests = 0
+
+    async def request(self, route, **kwargs):
+        self.requests += 1
+        return {}
+
+
+def make_bot(**options):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    bot = commands.Bot(command_prefix="/", loop=loop)
+    state = bot._connection
+    state.user = SimpleNamespace(id=APPLICATION_ID)
+    state._add_guild(
+        Guild(data=dict(id=str(GUILD_ID), name="guild", roles=[]), state=state)
+    )
+    bot.http.request = StandInHTTP().request
+    slash_commands.BotPatcher(bot, **options).patch()
+    return bot
+
+
+def gateway_event(t, d):
+    return dict(op=0, s=None, t=t, d=d)
+
+
+def typing_start(channel_id=CHANNEL_ID, user_id=USER_ID):
+    return gateway_event(
+        "TYPING_START", dict(channel_id=str(channel_id), user_id=str(user_id))
+    )
+
+
+def user_data(user_id=USER_ID):
+    return dict(id=str(user_id), username="user", discriminator="0001", avatar=None)
+
+
+def member_data(user_id=USER_ID):
+    return dict(
+        user=user_data(user_id),
+        roles=[],
+        joined_at="2020-12-16T00:00:00+00:00",
+        deaf=False,
+        mute=False,
+    )
+
+
+def interaction_create(name, options=(), *, member=True, interaction_id=1):
+    d = dict(
+        id=str(interaction_id),
+        type=2,
+        token="token",
+        version=1,
+        channel_id=str(CHANNEL_ID),
+        data=dict(id="10", name=name, options=list(options)),
+    )
+
+    if member:
+        d["guild_id"] = str(GUILD_ID)
+        d["member"] = member_data()
+    else:
+        d["user"] = user_data()
+
+    return d
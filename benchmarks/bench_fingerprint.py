@@ -0,0 +1,113 @@
+"""Comparing large commands: pairwise list.remove scans versus fingerprints.
+
+    python -m benchmarks.bench_fingerprint [options] [choices]
+"""
+import sys
+import time
+
+from slash_commands import SlashCommand
+
+from ._support import APPLICATION_ID
+
+
+def command_payload(n_options, n_choices, reverse=False):
+    def ordered(items):
+        return items[::-1] if reverse else items
+
+    return dict(
+        id="1",
+        application_id=str(APPLICATION_ID),
+        name="large",
+        description="A command with many choices",
+        options=ordered(
+            [
+                dict(
+                    type=3,
+                    name=f"option{i}",
+                    description=f"Option {i}",
+                    choices=ordered(
+                        [
+                            dict(name=f"{i}-{j}", value=f"{i}-{j}")
+                            for j in range(n_choices)
+                        ]
+                    ),
+                )
+                for i in range(n_options)
+            ]
+        ),
+    )
+
+
+def legacy_compare_list(a, b, eq):
+    b = list(b)
+    for elem in a:
+        for idx, other in enumerate(b):
+            if eq(elem, other):
+                del b[idx]
+                break
+        else:
+            return False
+
+    return not b
+
+
+def legacy_choice_eq(a, b):
+    return a.name == b.name and a.value == b.value
+
+
+def legacy_option_eq(a, b):
+    return (
+        a.name == b.name
+        and a.required == b.required
+        and legacy_compare_list(a.choices, b.choices, legacy_choice_eq)
+        and legacy_compare_list(a.options, b.options, legacy_option_eq)
+    )
+
+
+def legacy_command_eq(a, b):
+    return (
+        a.application_id == b.application_id
+        and a.name == b.name
+        and a.description == b.description
+        and legacy_compare_list(a.options, b.options, legacy_option_eq)
+    )
+
+
+def reset_fingerprints(command):
+    command._invalidate()
+    for option in command.options:
+        option._fingerprint = None
+        for choice in option.choices:
+            choice._fingerprint = None
+
+
+def timeit(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        assert func()
+
+    return (time.perf_counter() - start) / repeat
+
+
+def main(n_options=25, n_choices=1000, repeat=5):
+    a = SlashCommand.make_dummy(command_payload(n_options, n_choices))
+    b = SlashCommand.make_dummy(command_payload(n_options, n_choices, reverse=True))
+
+    legacy = timeit(lambda: legacy_command_eq(a, b), repeat)
+
+    def cold():
+        reset_fingerprints(a)
+        reset_fingerprints(b)
+        return a == b
+
+    fingerprint = timeit(cold, repeat)
+    cached = timeit(lambda: a == b, repeat)
+
+    print(f"options x choices:   {n_options} x {n_choices} (reversed order)")
+    print(f"legacy compare_list  {legacy * 1e3:10.3f} ms")
+    print(f"fingerprint (cold)   {fingerprint * 1e3:10.3f} ms")
+    print(f"fingerprint (cached) {cached * 1e3:10.3f} ms")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,218 @@
+"""Microbenchmarks for the per-interaction hot path, run fully offline.
+
+Each round times a fixed calibration loop right before the case, and the
+case is scored as the median of its cost relative to that loop. The
+baseline stores those ratios rather than absolute times, so it carries
+across machines and load; a case whose ratio grew by more than the
+tolerance fails the run.
+
+    python -m benchmarks.bench_hot_path [--update] [--tolerance 0.3] [--rounds 21]
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+
+import discord
+
+from slash_commands import Interaction, SlashOption
+
+from ._support import GUILD_ID, interaction_create, make_bot
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+N_OPTIONS = 10
+
+
+def register_commands(bot):
+    @bot.slash_command(description="Ping")
+    async def ping(ctx):
+        pass
+
+    @bot.slash_command(description="Administration")
+    async def admin(ctx):
+        pass
+
+    @admin.group(description="Role management")
+    async def roles(ctx):
+        pass
+
+    # a subcommand with many options, mixing plain values and snowflakes
+    async def add(ctx, **options):
+        pass
+
+    roles.command(
+        description="Add roles",
+        options=[
+            SlashOption.string(f"text{i}", description="Text")
+            for i in range(N_OPTIONS // 2)
+        ]
+        + [
+            SlashOption.role(f"role{i}", description="Role")
+            for i in range(N_OPTIONS // 2)
+        ],
+    )(add)
+
+
+def nested_payload(member=True):
+    options = [dict(name=f"text{i}", value="x") for i in range(N_OPTIONS // 2)] + [
+        dict(name=f"role{i}", value=str(1000 + i)) for i in range(N_OPTIONS // 2)
+    ]
+    return interaction_create(
+        "admin",
+        [dict(name="roles", options=[dict(name="add", options=options)])],
+        member=member,
+    )
+
+
+CALIBRATION = 20_000
+
+
+def calibrate(n):
+    # plain dict and int work, roughly what parsing a payload does
+    for i in range(n):
+        data = {"id": str(i), "name": "name", "value": i}
+        int(data["id"]) + data["value"]
+
+
+def measure(func, number, rounds):
+    ratios = []
+    timings = []
+    for _ in range(rounds):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            calibrate(CALIBRATION)
+            calibrated = time.perf_counter()
+            func(number)
+            end = time.perf_counter()
+        finally:
+            gc.enable()
+
+        per_op = (end - calibrated) / number
+        timings.append(per_op)
+        ratios.append(per_op / ((calibrated - start) / CALIBRATION))
+
+    return statistics.median(ratios), statistics.median(timings) * 1e9
+
+
+def cases(bot):
+    state = bot._connection
+    run = bot.loop.run_until_complete
+    member_payload = nested_payload()
+    user_payload = nested_payload(member=False)
+
+    def parse(payload):
+        def bench(n):
+            for _ in range(n):
+                Interaction(state=state, data=payload)
+
+        return bench
+
+    def parse_author(payload):
+        def bench(n):
+            for _ in range(n):
+                Interaction(state=state, data=payload).author
+
+        return bench
+
+    def parse_cached_author(n):
+        # the member is in the guild's cache, so it's reused and updated
+        guild = state._get_guild(GUILD_ID)
+        member = Interaction(state=state, data=member_payload).author
+        guild._add_member(member)
+        try:
+            parse_author(member_payload)(n)
+        finally:
+            guild._remove_member(member)
+
+    def get_command(n):
+        ctx = bot.get_slash_context(Interaction(state=state, data=member_payload))
+        command = ctx.command
+        options = ctx.interaction.data.options
+        for _ in range(n):
+            ctx.get_command(command, options)
+
+    def invoke(n):
+        async def bench():
+            for _ in range(n):
+                interaction = Interaction(state=state, data=member_payload)
+                await bot.get_slash_context(interaction).invoke()
+
+        run(bench())
+
+    embed = discord.Embed(title="Title", description="Description")
+
+    def send(n):
+        ctx = bot.get_slash_context(Interaction(state=state, data=member_payload))
+
+        async def bench():
+            for _ in range(n):
+                await ctx.send("content", embed=embed)
+
+        run(bench())
+
+    return {
+        "parse_member": (parse(member_payload), 20_000),
+        "parse_user": (parse(user_payload), 20_000),
+        "parse_member_author": (parse_author(member_payload), 10_000),
+        "parse_user_author": (parse_author(user_payload), 10_000),
+        "parse_cached_author": (parse_cached_author, 10_000),
+        "get_command": (get_command, 20_000),
+        "invoke": (invoke, 5_000),
+        "send": (send, 5_000),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--update", action="store_true", help="rewrite the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    parser.add_argument("--rounds", type=int, default=21)
+    args = parser.parse_args(argv)
+
+    bot = make_bot()
+    register_commands(bot)
+
+    results = {
+        name: measure(func, number, args.rounds)
+        for name, (func, number) in cases(bot).items()
+    }
+
+    baseline = {}
+    if os.path.exists(BASELINE):
+        with open(BASELINE) as f:
+            baseline = json.load(f)
+
+    regressions = []
+    for name, (ratio, ns) in results.items():
+        line = f"{name:22} {ns:10.0f} ns/op {ratio:8.2f}x calibration"
+        if (base := baseline.get(name)) is not None:
+            change = ratio / base - 1
+            line += f"  {change:+7.1%} vs baseline"
+            if change > args.tolerance:
+                regressions.append(name)
+                line += "  REGRESSION"
+
+        print(line)
+
+    if args.update:
+        with open(BASELINE, "w") as f:
+            json.dump(
+                {name: round(ratio, 3) for name, (ratio, _) in results.items()},
+                f,
+                indent=4,
+            )
+            f.write("\n")
+
+        return 0
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
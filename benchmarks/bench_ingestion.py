@@ -0,0 +1,58 @@
+"""Per-event cost of the interaction ingestion path for non-interaction traffic.
+
+Compares the former ``on_socket_response`` listener, which spawns a task
+for every gateway event, against the ``INTERACTION_CREATE`` parser hook.
+
+    python -m benchmarks.bench_ingestion [events]
+"""
+import asyncio
+import sys
+import time
+
+from ._support import make_bot, typing_start
+
+
+async def _drain():
+    current = asyncio.current_task()
+    await asyncio.gather(*(t for t in asyncio.all_tasks() if t is not current))
+
+
+def feed(bot, events):
+    parsers = bot._connection.parsers
+
+    async def run():
+        start = time.perf_counter()
+        for msg in events:
+            # what DiscordWebSocket.received_message does for each event,
+            # minus the event's own parser
+            bot.dispatch("socket_response", msg)
+            parsers.get(msg["t"])
+
+        await _drain()
+        return time.perf_counter() - start
+
+    return bot.loop.run_until_complete(run())
+
+
+def main(n=100_000):
+    events = [typing_start() for _ in range(n)]
+
+    bot = make_bot()
+
+    async def on_socket_response(p):
+        if not p["t"] == "INTERACTION_CREATE":
+            return
+
+    bot.add_listener(on_socket_response)
+    listener = feed(bot, events)
+
+    hook = feed(make_bot(), events)
+
+    print(f"events:                  {n}")
+    print(f"socket_response listener {listener / n * 1e9:8.0f} ns/event")
+    print(f"parser hook              {hook / n * 1e9:8.0f} ns/event")
+    print(f"removed                  {(listener - hook) / n * 1e9:8.0f} ns/event")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,192 @@
+"""Replay recorded interaction traffic through the full dispatch stack.
+
+Payloads captured by ``InteractionRecorder`` are fed to the
+``INTERACTION_CREATE`` parser at their recorded pace, scaled by
+``--speed``, or at a fixed ``--rate``. A local HTTP server stands in for
+Discord, adding latency and the occasional 429, so responses go through
+discord.py's real request and retry path. Latency is measured from
+injection to the sink accepting the interaction's initial response.
+
+Without ``--extension`` every recorded command gets a stub that replies
+immediately, which measures the library alone.
+
+    python -m benchmarks.replay LOG [--rate N | --speed X] [--extension NAME]
+        [--latency 0.05] [--jitter 0.02] [--rate-limit 0.01] [--retry-after 0.1]
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+from aiohttp import web
+from discord.ext import commands
+from discord.http import Route
+
+from slash_commands import BotPatcher, SlashCommand, read_interactions
+
+from ._support import APPLICATION_ID, user_data
+
+DEADLINE = 3.0
+
+
+class DiscordSink:
+    def __init__(self, *, latency, jitter, rate_limit, retry_after):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.pending = {}
+        self.latencies = []
+        self.requests = 0
+        self.rate_limited = 0
+        self.last_response = None
+
+    async def handle(self, request):
+        self.requests += 1
+        if random.random() < self.rate_limit:
+            self.rate_limited += 1
+            body = {
+                "message": "You are being rate limited.",
+                "retry_after": self.retry_after * 1000,
+                "global": False,
+            }
+            return web.Response(
+                body=json.dumps(body).encode(),
+                status=429,
+                # discord.py only decodes exactly "application/json", and
+                # treats a 429 without Via as a Cloudflare ban
+                content_type="application/json",
+                headers={"Via": "1.1 google"},
+            )
+
+        await asyncio.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+
+        parts = request.path.split("/")
+        if parts[-1] == "callback":
+            if (injected := self.pending.pop(int(parts[-3]), None)) is not None:
+                self.last_response = time.perf_counter()
+                self.latencies.append(self.last_response - injected)
+
+            return web.Response(status=204)
+
+        if request.path.endswith("/users/@me"):
+            return web.json_response(user_data(APPLICATION_ID))
+
+        return web.json_response({})
+
+
+def register_stubs(bot, records):
+    async def stub(ctx, **options):
+        await ctx.send("ok")
+
+    for name in {data["data"]["name"] for _, data in records if "data" in data}:
+        bot.add_slash_command(SlashCommand(stub, name, description="Replayed"))
+
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+async def replay(bot, records, sink, args):
+    loop = bot.loop
+    parse = bot._connection.parsers["INTERACTION_CREATE"]
+
+    def inject(interaction_id, data):
+        sink.pending[interaction_id] = time.perf_counter()
+        # ids are renumbered so the sink can match responses
+        parse(dict(data, id=str(interaction_id)))
+
+    first = records[0][0]
+    start = loop.time() + 0.1
+    offset = 0.0
+    for idx, (timestamp, data) in enumerate(records):
+        offset = idx / args.rate if args.rate else (timestamp - first) / args.speed
+        loop.call_at(start + offset, inject, idx + 1, data)
+
+    started = time.perf_counter() + 0.1
+    deadline = start + offset + args.timeout
+    await asyncio.sleep(offset + 0.1)
+    while sink.pending and loop.time() < deadline:
+        await asyncio.sleep(0.05)
+
+    return (sink.last_response or time.perf_counter()) - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("log")
+    pacing = parser.add_mutually_exclusive_group()
+    pacing.add_argument("--rate", type=float, help="interactions per second")
+    pacing.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--extension", action="append", default=[])
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--rate-limit", type=float, default=0.01)
+    parser.add_argument("--retry-after", type=float, default=0.1)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    args = parser.parse_args(argv)
+
+    records = list(read_interactions(args.log))
+    if not records:
+        print("no interactions recorded")
+        return 1
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    bot = commands.Bot(command_prefix="/", loop=loop)
+    BotPatcher(bot, application_id=APPLICATION_ID).patch()
+    for extension in args.extension:
+        bot.load_extension(extension)
+
+    if not args.extension:
+        register_stubs(bot, records)
+
+    sink = DiscordSink(
+        latency=args.latency,
+        jitter=args.jitter,
+        rate_limit=args.rate_limit,
+        retry_after=args.retry_after,
+    )
+
+    async def run():
+        app = web.Application()
+        app.router.add_route("*", "/{tail:.*}", sink.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+
+        base = Route.BASE
+        Route.BASE = "http://127.0.0.1:{}/api/v7".format(
+            site._server.sockets[0].getsockname()[1]
+        )
+        try:
+            await bot.http.static_login("token", bot=True)
+            return await replay(bot, records, sink, args)
+        finally:
+            Route.BASE = base
+            await bot.http.close()
+            await runner.cleanup()
+
+    elapsed = loop.run_until_complete(run())
+
+    latencies = sorted(sink.latencies)
+    print(f"interactions   {len(records)}")
+    print(f"answered       {len(latencies)} ({len(sink.pending)} unanswered)")
+    print(f"throughput     {len(latencies) / elapsed:.1f}/s over {elapsed:.2f}s")
+    if latencies:
+        for p in (50, 90, 99):
+            print(f"p{p:<13} {percentile(latencies, p) * 1000:.1f} ms")
+
+        print(f"max            {latencies[-1] * 1000:.1f} ms")
+        late = sum(latency > DEADLINE for latency in latencies)
+        print(f"over {DEADLINE:.0f}s        {late}")
+
+    print(f"http requests  {sink.requests} ({sink.rate_limited} rate limited)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
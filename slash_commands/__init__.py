@@ -3,4 +3,18 @@ from .interaction import *
 from .message import *
 from .cog import *
 from .context import *
-from .bot_patcher import *
\ No newline at end of file
+from .bot_patcher import *
+from .sync import *
+from .cooldowns import *
+from .checks import *
+from .executors import *
+from .metrics import *
+from .server import *
+from .workers import *
+from .uploads import *
+from .resolver import *
+from .registry import *
+from .autocomplete import *
+from .admission import *
+from .profiler import *
+from .recorder import *
\ No newline at end of file
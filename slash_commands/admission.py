@@ -0,0 +1,104 @@
+import asyncio
+from enum import IntEnum
+
+from aiohttp.payload import BytesPayload
+from discord import utils
+
+from .core import _setting_decorator
+
+
+class SlashPriority(IntEnum):
+    LOW = 0
+    NORMAL = 1
+    HIGH = 2
+
+
+DEFAULT_BUSY_MESSAGE = "I'm busy right now, please try again in a moment."
+
+# shed once pressure reaches the threshold; 1.0 is either limit being hit
+DEFAULT_THRESHOLDS = {
+    SlashPriority.LOW: 0.5,
+    SlashPriority.NORMAL: 1.0,
+    SlashPriority.HIGH: float("inf"),
+}
+
+
+class SlashAdmissionController:
+    # sits in front of invoke, turning away cheaper commands with a canned
+    # ephemeral reply while the loop lags or too much is in flight
+    def __init__(
+        self,
+        bot,
+        *,
+        max_in_flight=256,
+        max_lag=0.25,
+        interval=0.05,
+        thresholds=DEFAULT_THRESHOLDS,
+        message=DEFAULT_BUSY_MESSAGE,
+    ):
+        self.bot = bot
+        self.max_in_flight = max_in_flight
+        self.max_lag = max_lag
+        self.interval = interval
+        self.thresholds = thresholds
+        # below this nothing is shed, so there's no need to look up priorities
+        self._lowest_threshold = min(thresholds.values())
+        self.in_flight = 0
+        self.lag = 0.0
+        self.shed = {}
+        self._monitor = None
+        # serialized once, shedding has to stay cheap
+        self.busy_response = utils.to_json(
+            dict(type=4, data=dict(content=message, flags=64))
+        ).encode()
+
+    async def _measure_lag(self):
+        loop = self.bot.loop
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            # a stall is only seen once it's over, so let it fade out
+            # rather than be forgotten on the next sample
+            self.lag = max(loop.time() - started - self.interval, self.lag / 2)
+
+    @property
+    def pressure(self):
+        return max(self.in_flight / self.max_in_flight, self.lag / self.max_lag)
+
+    def admit(self, ctx):
+        if self._monitor is None:
+            self._monitor = self.bot.loop.create_task(self._measure_lag())
+
+        if ctx.command and (pressure := self.pressure) >= self._lowest_threshold:
+            entry, _ = ctx.command.plan.resolve(ctx.interaction.data.options)
+            priority = SlashPriority.NORMAL
+            if entry.priority is not None:
+                priority = entry.priority
+
+            if pressure >= self.thresholds[priority]:
+                self.shed[entry.path] = self.shed.get(entry.path, 0) + 1
+                if (metrics := self.bot.slash_metrics) is not None:
+                    metrics.get(entry.path).shed += 1
+
+                return False
+
+        self.in_flight += 1
+        return True
+
+    def release(self, *_):
+        self.in_flight -= 1
+
+    async def reject(self, ctx):
+        await self.bot.http.request(
+            ctx._callback_route(),
+            data=BytesPayload(self.busy_response, content_type="application/json"),
+        )
+
+    def close(self):
+        if self._monitor is not None:
+            self._monitor.cancel()
+            self._monitor = None
+
+
+def priority(level):
+    return _setting_decorator("priority", lambda _: SlashPriority(level))
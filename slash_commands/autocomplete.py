@@ -0,0 +1,43 @@
+from bisect import bisect_left
+
+from .core import SlashOptionChoice
+
+MAX_CHOICES = 25
+
+
+def to_choice(candidate):
+    if isinstance(candidate, SlashOptionChoice):
+        return candidate
+
+    if isinstance(candidate, tuple):
+        return SlashOptionChoice(*candidate)
+
+    return SlashOptionChoice(str(candidate), candidate)
+
+
+class PrefixIndex:
+    # sorted once, then every lookup is two bisects bounded by the limit
+    __slots__ = ("_keys", "_choices", "_fold")
+
+    def __init__(self, candidates, *, fold=str.casefold):
+        entries = sorted(
+            ((fold(choice.name), choice) for choice in map(to_choice, candidates)),
+            key=lambda entry: entry[0],
+        )
+        self._keys = [key for key, _ in entries]
+        self._choices = [choice for _, choice in entries]
+        self._fold = fold
+
+    def __len__(self):
+        return len(self._keys)
+
+    def search(self, prefix, limit=MAX_CHOICES):
+        prefix = self._fold(prefix)
+        start = bisect_left(self._keys, prefix)
+        stop = bisect_left(
+            self._keys,
+            prefix + "\U0010ffff",
+            start,
+            min(start + limit, len(self._keys)),
+        )
+        return self._choices[start:stop]
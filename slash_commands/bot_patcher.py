@@ -1,78 +1,250 @@
+from contextlib import contextmanager
+
+from aiohttp.payload import BytesPayload
 from discord.http import Route
 from discord.ext.commands.bot import BotBase
 
-from .core import SlashCommand, slash_command
+from .core import SlashCommand, slash_command, memory_report
+from .admission import SlashAdmissionController
+from .checks import SlashPermissionCache
 from .context import SlashContext
 from .interaction import InteractionType, Interaction
+from .metrics import SlashMetrics
+from .registry import SlashRegistry, SlashRegistryTransaction
+from .resolver import SlashResolver
+from .sync import (
+    GuildSyncScheduler,
+    SyncManifest,
+    diff_slash_commands,
+    hash_slash_commands,
+)
 
 
 class BotPatcher:
-    def __init__(self, bot):
+    def __init__(
+        self,
+        bot,
+        *,
+        auto_defer=None,
+        metrics=False,
+        application_id=None,
+        resolver=None,
+        permissions=None,
+        admission=None,
+        profiler=None,
+        recorder=None,
+    ):
         if not isinstance(bot, BotBase):
             raise RuntimeError("'BotBase' subclass is necessary")
 
         self.bot = bot
+        self.auto_defer = auto_defer
+        self.metrics = SlashMetrics() if metrics is True else metrics or None
+        # only needed when running without a gateway connection
+        self._application_id = application_id
+        self.resolver = resolver or SlashResolver(bot)
+        self.permissions = permissions or SlashPermissionCache(bot)
+        self.admission = (
+            SlashAdmissionController(bot) if admission is True else admission or None
+        )
+        self.profiler = profiler
+        self.recorder = recorder
+        self._transaction = None
+        self._extension_methods = {}
+
+    @property
+    def application_id(self):
+        return self.bot.slash_application_id or self.bot.user.id
 
     def get_slash_context(self, interaction, *, cls=SlashContext):
         return cls(bot=self.bot, interaction=interaction)
 
+    def _swap_registry(self, registry):
+        # dispatch only reads slash_registry, the rest are conveniences
+        self.bot.slash_registry = registry
+        self.bot.slash_commands = registry.commands
+        self.bot.guild_slash_commands = registry.guild_commands
+        self.bot.slash_cogs = registry.cogs
+
+    @contextmanager
+    def slash_transaction(self):
+        # nested calls join the outer transaction; nothing is visible until
+        # the outermost one exits, and a failed one is discarded
+        if self._transaction is not None:
+            yield self._transaction
+            return
+
+        self._transaction = transaction = SlashRegistryTransaction(
+            self.bot.slash_registry
+        )
+        try:
+            yield transaction
+        finally:
+            self._transaction = None
+
+        self._swap_registry(transaction.commit())
+
     def add_slash_command(self, slash_command):
-        if slash_command.name in self.bot.slash_commands:
-            raise RuntimeError(f"{slash_command.name} is a registered slash command.")
+        # on its own this copies the registry, so registering many at once
+        # belongs in one transaction; extensions and cogs already are
+        with self.slash_transaction() as transaction:
+            registries = transaction.registries(slash_command)
+            for registry in registries:
+                if slash_command.name in registry:
+                    raise RuntimeError(
+                        f"{slash_command.name} is a registered slash command."
+                    )
+
+            slash_command.application_id = self.application_id
+            slash_command.compile()
+            for registry in registries:
+                registry[slash_command.name] = slash_command
 
-        slash_command.application_id = self.bot.user.id
-        self.bot.slash_commands[slash_command.name] = slash_command
         return slash_command
 
-    def get_slash_command(self, name):
-        return self.bot.slash_commands.get(name)
+    def remove_slash_command(self, slash_command):
+        with self.slash_transaction() as transaction:
+            for registry in transaction.registries(slash_command):
+                if registry.get(slash_command.name) is slash_command:
+                    del registry[slash_command.name]
 
-    def raw_delete_slash_command(self, command_id, guild_id=None):
+    def get_slash_command(self, name, guild_id=None):
+        return self.bot.slash_registry.get_command(name, guild_id)
+
+    def get_slash_commands(self, guild_id=None):
+        return self.bot.slash_registry.get_commands(guild_id)
+
+    def _command_route(self, method, command_id=None, guild_id=None):
         url = (
-            "applications/{application_id}/commands/{command_id}"
+            "/applications/{application_id}/commands"
             if not guild_id
-            else "applications/{my_application_id}/guilds/{guild_id}/commands/{command_id}"
+            else "/applications/{application_id}/guilds/{guild_id}/commands"
         )
-        r = Route(
-            "DELETE",
+        if command_id:
+            url += "/{command_id}"
+
+        return Route(
+            method,
             url,
-            application_id=self.bot.user.id,
+            application_id=self.application_id,
             command_id=command_id,
             guild_id=guild_id,
         )
+
+    def raw_get_slash_commands(self, guild_id=None):
+        return self.bot.http.request(self._command_route("GET", guild_id=guild_id))
+
+    def raw_create_slash_command(self, payload, guild_id=None):
+        r = self._command_route("POST", guild_id=guild_id)
+        return self.bot.http.request(r, json=payload)
+
+    def raw_edit_slash_command(self, command_id, payload, guild_id=None):
+        r = self._command_route("PATCH", command_id, guild_id)
+        return self.bot.http.request(r, json=payload)
+
+    def raw_delete_slash_command(self, command_id, guild_id=None):
+        r = self._command_route("DELETE", command_id, guild_id)
         return self.bot.http.request(r)
 
     async def delete_slash_command(self, name, *, guild_id=None):
-        command = self.bot.slash_commands.pop(name, None)
+        with self.slash_transaction() as transaction:
+            command = transaction.get_commands(guild_id).pop(name, None)
+
         if not command:
             raise RuntimeError(f"Slash command {name} wasn't found!")
 
-        if not command.id:
+        command_id = command.ids.get(guild_id)
+        if not command_id:
             raise RuntimeError(
                 f"Slash command {name}'s ID was missing, make sure to sync it first"
             )
 
-        await self.bot.http.delete_slash_command(command.id, guild_id)
+        await self.bot.http.delete_slash_command(command_id, guild_id)
         return command
 
     def add_slash_cog(self, cog):
-        if cog.name in self.bot.slash_cogs:
-            raise RuntimeError(f"{cog.name} is a registered slash cog.")
+        with self.slash_transaction() as transaction:
+            if cog.name in transaction.cogs:
+                raise RuntimeError(f"{cog.name} is a registered slash cog.")
 
-        self.bot.slash_cogs[cog.name] = cog
-        for command in cog.commands:
-            self.bot.add_slash_command(command)
+            transaction.cogs[cog.name] = cog
+            for command in cog.commands:
+                self.bot.add_slash_command(command)
 
     def slash_command(self, *args, **kwargs):
+        # many of these outside an extension are best wrapped in
+        # `with bot.slash_transaction():` so they're registered at once
         def decorator(func):
-            res = slash_command(*args, application_id=self.bot.user.id, **kwargs)(func)
+            res = slash_command(*args, application_id=self.application_id, **kwargs)(
+                func
+            )
             self.bot.add_slash_command(res)
             return res
 
         return decorator
 
-    def sync_slash_commands(self):
-        return self.put_slash_commands(self.bot.slash_commands.values())
+    def sync_guild_slash_commands(
+        self, guild_ids=None, *, concurrency=8, manifest=None
+    ):
+        scheduler = GuildSyncScheduler(
+            self.bot, concurrency=concurrency, manifest=manifest
+        )
+        return scheduler.run(guild_ids)
+
+    def slash_memory_report(self):
+        return memory_report(
+            [
+                *self.bot.slash_commands.values(),
+                *(
+                    command
+                    for commands in self.bot.guild_slash_commands.values()
+                    for command in commands.values()
+                ),
+            ]
+        )
+
+    async def sync_slash_commands(self, guild_id=None, *, manifest=None):
+        commands = list(self.get_slash_commands(guild_id).values())
+        if isinstance(manifest, str):
+            manifest = SyncManifest(manifest)
+
+        digest = hash_slash_commands(commands)
+        ids = manifest and manifest.get_ids(guild_id, digest)
+        if ids and all(command.name in ids for command in commands):
+            for command in commands:
+                command.ids[guild_id] = ids[command.name]
+
+            return [], [], []
+
+        remote = [
+            SlashCommand.make_dummy(data)
+            for data in await self.bot.http.get_slash_commands(guild_id)
+        ]
+        to_create, to_edit, to_delete = diff_slash_commands(commands, remote, guild_id)
+
+        for command in to_delete:
+            await self.bot.http.delete_slash_command(command.id, guild_id)
+
+        for command in to_create:
+            data = await self.bot.http.create_slash_command(
+                command.to_dict(with_id=False), guild_id
+            )
+            command.ids[guild_id] = int(data["id"])
+
+        for command in to_edit:
+            await self.bot.http.edit_slash_command(
+                command.ids[guild_id], command.to_dict(with_id=False), guild_id
+            )
+
+        if manifest:
+            manifest.update(
+                guild_id,
+                digest,
+                {command.name: command.ids[guild_id] for command in commands},
+            )
+            manifest.save()
+
+        return to_create, to_edit, to_delete
 
     async def on_slash_command_error(self, ctx, error):
         self.bot.logger.error(
@@ -82,44 +254,84 @@ class BotPatcher:
     def _remove_module_references(self, name):
         BotBase._remove_module_references(self.bot, name)
 
-        for cog in self.bot.slash_cogs.copy().values():
-            if cog.__module__ == name:
-                cog.teardown()
+        with self.slash_transaction() as transaction:
+            for cog in list(transaction.cogs.values()):
+                if cog.__module__ == name:
+                    cog.teardown()
+
+    def load_extension(self, name):
+        with self.slash_transaction():
+            self._extension_methods["load_extension"](name)
+
+    def unload_extension(self, name):
+        with self.slash_transaction():
+            self._extension_methods["unload_extension"](name)
+
+    def reload_extension(self, name):
+        # the old cogs stay live until the new module has set up
+        with self.slash_transaction():
+            self._extension_methods["reload_extension"](name)
 
     def put_slash_commands(self, commands, guild_id=None):
-        r = Route(
-            "PUT",
-            "/applications/{application_id}/commands"
-            if not guild_id
-            else "/applications/{application_id}/guilds/{guild_id}/commands",
-            application_id=self.bot.user.id,
-            guild_id=guild_id,
-        )
+        r = self._command_route("PUT", guild_id=guild_id)
+        body = b"[" + b",".join(command.to_bytes() for command in commands) + b"]"
         return self.bot.http.request(
-            r, json=[command.to_dict(with_id=False) for command in commands]
+            r, data=BytesPayload(body, content_type="application/json")
         )
 
-    async def on_socket_response(self, p):
-        if not p["t"] == "INTERACTION_CREATE":
+    def parse_interaction_create(self, data):
+        # called by the gateway for this event only, in place of a
+        # socket_response listener that would see every event; this runs
+        # inside received_message, so anything that can raise is left to
+        # the task
+        if self.bot.slash_recorder is None and data.get("type") not in (
+            InteractionType.APPLICATION_COMMAND.value,
+            InteractionType.APPLICATION_COMMAND_AUTOCOMPLETE.value,
+        ):
             return
 
-        interaction = Interaction(state=self.bot._connection, data=p["d"])
-
-        if interaction.type is not InteractionType.APPLICATION_COMMAND:
-            return
-
-        ctx = self.bot.get_slash_context(interaction)
-        await ctx.invoke()
+        self.bot.loop.create_task(self.handle_interaction(data))
+
+    async def handle_interaction(self, data):
+        try:
+            if self.bot.slash_recorder is not None:
+                self.bot.slash_recorder.record(data)
+
+            interaction = Interaction(state=self.bot._connection, data=data)
+
+            if interaction.type is InteractionType.APPLICATION_COMMAND:
+                ctx = self.bot.get_slash_context(interaction)
+                admission = self.bot.slash_admission
+                if admission is None:
+                    await ctx.invoke()
+                elif admission.admit(ctx):
+                    try:
+                        await ctx.invoke()
+                    finally:
+                        admission.release()
+                else:
+                    await admission.reject(ctx)
+            elif interaction.type is InteractionType.APPLICATION_COMMAND_AUTOCOMPLETE:
+                ctx = self.bot.get_slash_context(interaction)
+                if ctx.command:
+                    await ctx.autocomplete()
+        except Exception:
+            await self.bot.on_error("interaction_create", data)
 
     def patch(self, force_override=True):
         attrs = [
             "get_slash_context",
             "get_slash_command",
+            "get_slash_commands",
+            "remove_slash_command",
+            "sync_guild_slash_commands",
             "add_slash_cog",
             "add_slash_command",
             "delete_slash_command",
             "slash_command",
             "sync_slash_commands",
+            "slash_transaction",
+            "slash_memory_report",
             "on_slash_command_error",
             "_remove_module_references",
             "put_slash_commands",
@@ -131,12 +343,36 @@ class BotPatcher:
 
             setattr(self.bot, attr, getattr(self, attr))
 
-        for attr in ("slash_commands", "slash_cogs"):
+        for attr in ("slash_commands", "guild_slash_commands", "slash_cogs"):
             if hasattr(self.bot, "slash_commands") and not force_override:
                 raise RuntimeError(f"The bot already has {attr} attribute")
 
-            setattr(self.bot, attr, {})
+        self._swap_registry(SlashRegistry())
+
+        for attr in ("load_extension", "unload_extension", "reload_extension"):
+            self._extension_methods[attr] = getattr(self.bot, attr)
+            setattr(self.bot, attr, getattr(self, attr))
 
+        self.bot.slash_auto_defer = self.auto_defer
+        self.bot.slash_metrics = self.metrics
+        self.bot.slash_application_id = self._application_id
+        self.bot.slash_resolver = self.resolver
+        self.bot.slash_permissions = self.permissions
+        self.bot.slash_admission = self.admission
+        self.bot.slash_profiler = self.profiler
+        self.bot.slash_recorder = self.recorder
+        for event in (
+            "on_member_update",
+            "on_guild_role_update",
+            "on_guild_role_delete",
+        ):
+            self.bot.add_listener(getattr(self.permissions, event), event)
+
+        self.bot.http.get_slash_commands = self.raw_get_slash_commands
+        self.bot.http.create_slash_command = self.raw_create_slash_command
+        self.bot.http.edit_slash_command = self.raw_edit_slash_command
         self.bot.http.delete_slash_command = self.raw_delete_slash_command
 
-        self.bot.add_listener(self.on_socket_response)
\ No newline at end of file
+        self.bot._connection.parsers[
+            "INTERACTION_CREATE"
+        ] = self.parse_interaction_create
\ No newline at end of file
@@ -0,0 +1,170 @@
+import time
+from collections import OrderedDict
+from inspect import isawaitable
+
+from discord import Member, Permissions
+
+from .core import _setting_decorator
+
+
+class SlashCheckFailure(Exception):
+    pass
+
+
+class SlashNoPrivateMessage(SlashCheckFailure):
+    def __init__(self):
+        super().__init__("This command cannot be used in private messages.")
+
+
+class SlashNotOwner(SlashCheckFailure):
+    def __init__(self):
+        super().__init__("You do not own this bot.")
+
+
+class SlashMissingPermissions(SlashCheckFailure):
+    def __init__(self, missing_perms):
+        self.missing_perms = missing_perms
+        missing = ", ".join(perm.replace("_", " ") for perm in missing_perms)
+        super().__init__(
+            f"You are missing {missing} permission(s) to run this command."
+        )
+
+
+class SlashPermissionCache:
+    # guild level permissions per (guild, user), dropped on member and role
+    # updates; guilds that aren't cached have their roles fetched once
+    def __init__(self, bot, *, ttl=30.0, max_size=10000):
+        self.bot = bot
+        self.ttl = ttl
+        self.max_size = max_size
+        self._permissions = OrderedDict()
+        self._roles = {}
+
+    def _get(self, cache, key):
+        if (cached := cache.get(key)) is None:
+            return None
+
+        expires, value = cached
+        if expires < time.monotonic():
+            del cache[key]
+            return None
+
+        return value
+
+    async def _guild_roles(self, guild_id):
+        if (roles := self._get(self._roles, guild_id)) is None:
+            data = await self.bot.http.get_roles(guild_id)
+            roles = {int(role["id"]): int(role["permissions"]) for role in data}
+            self._roles[guild_id] = (time.monotonic() + self.ttl, roles)
+
+        return roles
+
+    async def _compute(self, ctx, member_data):
+        author = ctx.author
+        if isinstance(author, Member):
+            return author.guild_permissions
+
+        roles = await self._guild_roles(ctx.guild_id)
+        value = roles.get(ctx.guild_id, 0)
+        for role_id in member_data.get("roles", ()):
+            value |= roles.get(int(role_id), 0)
+
+        permissions = Permissions(value)
+        return Permissions.all() if permissions.administrator else permissions
+
+    async def get(self, ctx):
+        member_data = ctx.interaction._payload.get("member")
+        if member_data is None:
+            return None
+
+        # sent with the interaction, already resolved for the channel
+        if "permissions" in member_data:
+            return Permissions(int(member_data["permissions"]))
+
+        key = (ctx.guild_id, ctx.interaction.author_id)
+        if (permissions := self._get(self._permissions, key)) is not None:
+            self._permissions.move_to_end(key)
+            return permissions
+
+        permissions = await self._compute(ctx, member_data)
+        self._permissions[key] = (time.monotonic() + self.ttl, permissions)
+        while len(self._permissions) > self.max_size:
+            self._permissions.popitem(last=False)
+
+        return permissions
+
+    def invalidate(self, guild_id, user_id=None):
+        if user_id is not None:
+            self._permissions.pop((guild_id, user_id), None)
+            return
+
+        self._roles.pop(guild_id, None)
+        for key in [key for key in self._permissions if key[0] == guild_id]:
+            del self._permissions[key]
+
+    async def on_member_update(self, before, after):
+        self.invalidate(after.guild.id, after.id)
+
+    async def on_guild_role_update(self, before, after):
+        self.invalidate(after.guild.id)
+
+    async def on_guild_role_delete(self, role):
+        self.invalidate(role.guild.id)
+
+
+async def run_checks(ctx, checks):
+    for predicate in checks:
+        result = predicate(ctx)
+        if isawaitable(result):
+            result = await result
+
+        if not result:
+            raise SlashCheckFailure(
+                f"The check functions for command {' '.join(ctx.command_path)} failed."
+            )
+
+
+def check(predicate):
+    # checks run top to bottom as written, after the parents' checks
+    return _setting_decorator("checks", lambda checks: (predicate, *(checks or ())))
+
+
+def guild_only():
+    def predicate(ctx):
+        if ctx.guild_id is None:
+            raise SlashNoPrivateMessage()
+
+        return True
+
+    return check(predicate)
+
+
+def is_owner():
+    async def predicate(ctx):
+        if not await ctx.bot.is_owner(ctx.author):
+            raise SlashNotOwner()
+
+        return True
+
+    return check(predicate)
+
+
+def has_permissions(**perms):
+    invalid = set(perms) - set(Permissions.VALID_FLAGS)
+    if invalid:
+        raise RuntimeError(f"Invalid permission(s): {', '.join(invalid)}")
+
+    async def predicate(ctx):
+        permissions = await ctx.bot.slash_permissions.get(ctx)
+        if permissions is None:
+            raise SlashNoPrivateMessage()
+
+        missing = [
+            perm for perm, value in perms.items() if getattr(permissions, perm) != value
+        ]
+        if missing:
+            raise SlashMissingPermissions(missing)
+
+        return True
+
+    return check(predicate)
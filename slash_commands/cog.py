@@ -21,6 +21,7 @@ class SlashCog:
         return set(self._commands.values())
 
     def teardown(self):
-        self.bot.slash_cogs.pop(self.name)
-        for command in self.commands:
-            self.bot.slash_commands.pop(command.name, None)
\ No newline at end of file
+        with self.bot.slash_transaction() as transaction:
+            transaction.cogs.pop(self.name)
+            for command in self.commands:
+                self.bot.remove_slash_command(command)
\ No newline at end of file
@@ -1,12 +1,31 @@
-from inspect import signature, _empty
+from itertools import islice
+from time import perf_counter
 
-import aiohttp
 import discord
 from discord.http import Route
-from discord import utils, Object
+from discord import Object
 
+from .autocomplete import MAX_CHOICES, PrefixIndex, to_choice
+from .checks import run_checks
 from .interaction import InteractionResponseType
-from .core import SlashSubCommand, SlashSubCommandGroup
+from .uploads import DEFAULT_UPLOAD_LIMIT, multipart_body
+
+_missing = object()
+
+DEFAULT_AUTO_DEFER = 2.0
+
+
+class _InteractionRoute(Route):
+    # Discord limits these per interaction token; keyed on the path alone
+    # like other routes, every response would queue behind every other
+    # interaction's on the same bucket lock
+    def __init__(self, method, path, **parameters):
+        super().__init__(method, path, **parameters)
+        self.interaction_id = parameters["interaction"].id
+
+    @property
+    def bucket(self):
+        return f"{self.interaction_id}:{self.path}"
 
 
 class SlashContext:
@@ -14,9 +33,22 @@ class SlashContext:
         self.bot = kw["bot"]
         self._state = self.bot._connection
         self.interaction = kw["interaction"]
-        self.command = self.bot.get_slash_command(self.interaction.data.name)
+        # read once; a reload swapping the registry mid-invocation
+        # doesn't affect this one
+        self.registry = self.bot.slash_registry
+        self.command = self.registry.get_command(
+            self.interaction.data.name, self.interaction.guild_id
+        )
         self.invoked_subcommand_group = None
         self.invoked_subcommand = None
+        self._edits = None
+        self._entry = None
+        self._responded = False
+        self._responded_at = None
+        self._deferred = None
+        self._deferred_ephemeral = False
+        self._inline = None
+        self._inline_sent = None
 
     @property
     def author(self):
@@ -30,6 +62,11 @@ class SlashContext:
     def guild(self):
         return self.bot.get_guild(self.guild_id) if self.guild_id else None
 
+    @property
+    def upload_limit(self):
+        guild = self.guild
+        return guild.filesize_limit if guild is not None else DEFAULT_UPLOAD_LIMIT
+
     @property
     def channel_id(self):
         return self.interaction.channel_id
@@ -42,56 +79,258 @@ class SlashContext:
             else None
         )
 
-    def get_command(self, command, options):
-        temp_subcommand = temp_subcommand_group = None
-        for option in options:
-            temp_subcommand = command.commands.get(option.name)
-            temp_subcommand_group = hasattr(command, "groups") and command.groups.get(
-                option.name
-            )
-            if temp_subcommand or temp_subcommand_group:
-                options = option.options
-                break
-
-        if temp_subcommand:
-            command = self.invoked_subcommand = temp_subcommand
-        elif temp_subcommand_group:
-            self.invoked_subcommand_group = temp_subcommand_group
-            return self.get_command(self.invoked_subcommand_group, options)
+    @property
+    def command_path(self):
+        return self._entry.path if self._entry else (self.command.name,)
 
-        return command, {option.name: option.value for option in options}
+    def get_command(self, command, options):
+        entry, options = command.plan.resolve(options)
+        self._entry = entry
+        self.invoked_subcommand_group = entry.subcommand_group
+        self.invoked_subcommand = entry.subcommand
+        return entry.command, entry.build_kwargs(options)
 
     async def invoke(self):
         if not self.command:
             return
 
+        started = perf_counter()
+        callback_started = callback_ended = trace = None
+        profiler = self.bot.slash_profiler
+        failed = False
         self.bot.dispatch("slash_command", self)
         try:
             command, options = self.get_command(
                 self.command, self.interaction.data.options
             )
-            parameters = signature(command.callback).parameters
+            entry = self._entry
+
+            if entry.checks:
+                await run_checks(self, entry.checks)
+
+            # before resolving, which may hit the API for a rejected call;
+            # the slot first, so a call turned away doesn't spend a token
+            if (concurrency := entry.max_concurrency) is not None:
+                key = concurrency.acquire(self)
+
+            handle = None
+            try:
+                if entry.cooldown is not None:
+                    entry.cooldown.check(self)
 
-            for option in command.options:
-                if option.name not in options:
-                    if parameters[option.name].default is _empty:
-                        options[option.name] = None
-                    continue
+                # fetching what the cache didn't have counts towards the deadline
+                if threshold := self._auto_defer_threshold():
+                    handle = self.bot.loop.call_later(threshold, self._auto_defer)
 
-                if (val := options[option.name]) is None:
-                    continue
+                if entry.resolvers:
+                    await self.bot.slash_resolver.resolve(
+                        self, entry.resolvers, options
+                    )
 
-                if option.type > 5:
-                    # case where the value is a snowflake
-                    # since option 6, 7, and 8 return snowflakes
-                    options[option.name] = int(val)
+                callback_started = perf_counter()
+                if profiler is not None:
+                    trace = profiler.trace(self, command(self, **options))
+                    await trace
+                else:
+                    await command(self, **options)
+            finally:
+                callback_ended = perf_counter()
+                if handle:
+                    handle.cancel()
 
-            await command(self, **options)
+                if concurrency is not None:
+                    concurrency.release(key)
 
         except Exception as e:
+            failed = True
             self.bot.dispatch("slash_command_error", self, e)
         else:
             self.bot.dispatch("slash_command_completion", self)
+        finally:
+            if (metrics := self.bot.slash_metrics) is not None:
+                metrics.record_invocation(
+                    self.command_path,
+                    parse=self.interaction.parse_time,
+                    dispatch=callback_started and callback_started - started,
+                    callback=callback_started and callback_ended - callback_started,
+                    failed=failed,
+                )
+
+            if trace is not None:
+                profiler.finish(
+                    self,
+                    trace,
+                    started=started,
+                    callback_started=callback_started,
+                    callback_ended=callback_ended,
+                    failed=failed,
+                )
+
+    async def autocomplete(self):
+        # runs on every keystroke, so none of invoke's bookkeeping; always
+        # answers, with no choices if there's nothing to offer
+        choices = ()
+        try:
+            entry, options = self.command.plan.resolve(self.interaction.data.options)
+            focused = next((option for option in options if option.focused), None)
+            provider = focused and entry.autocompleters.get(focused.name)
+            if isinstance(provider, PrefixIndex):
+                choices = provider.search(str(focused.value or ""))
+            elif provider is not None:
+                # only the cog's own methods are handed the cog
+                cog = entry.command.cog
+                name = getattr(provider, "__name__", None)
+                if (
+                    cog is not None
+                    and name
+                    and getattr(type(cog), name, None) is provider
+                ):
+                    provider = provider.__get__(cog)
+
+                choices = map(to_choice, await provider(self, focused.value))
+
+            choices = [choice.to_dict() for choice in islice(choices, MAX_CHOICES)]
+        except Exception as e:
+            choices = ()
+            self.bot.dispatch("slash_command_error", self, e)
+
+        json = dict(
+            type=int(InteractionResponseType.APPLICATION_COMMAND_AUTOCOMPLETE_RESULT),
+            data=dict(choices=list(choices)),
+        )
+        if self._inline is not None:
+            if not self._inline.done():
+                self._inline.set_result(json)
+
+            return
+
+        await self._request(self._callback_route(), json)
+
+    def _mark_responded(self):
+        self._responded = True
+        self._responded_at = perf_counter()
+        if (metrics := self.bot.slash_metrics) is not None:
+            metrics.observe(
+                self.command_path,
+                "first_response",
+                self._responded_at - self.interaction.received_at,
+            )
+
+    def _auto_defer_threshold(self):
+        threshold = self._entry.auto_defer
+        if threshold is None:
+            threshold = self.bot.slash_auto_defer
+
+        return DEFAULT_AUTO_DEFER if threshold is True else threshold
+
+    def _auto_defer(self, ephemeral=None):
+        if self._responded:
+            return
+
+        if ephemeral is None:
+            ephemeral = self._entry is not None and bool(self._entry.ephemeral)
+
+        self._mark_responded()
+        self._deferred_ephemeral = ephemeral
+        json = dict(
+            type=int(InteractionResponseType.DEFFERED_CHANNEL_MESSAGE_WITH_SOURCE)
+        )
+        if ephemeral:
+            json["data"] = dict(flags=64)
+        if self._inline is not None:
+            self._inline.set_result(json)
+            self._deferred = self._inline_sent
+        else:
+            self._deferred = self.bot.loop.create_task(
+                self._request(self._callback_route(), json)
+            )
+
+    def _start_inline_response(self):
+        # the initial response becomes the body of the HTTP reply to the
+        # interactions endpoint instead of a callback request
+        self._inline = self.bot.loop.create_future()
+        self._inline_sent = self.bot.loop.create_future()
+        return self._inline
+
+    @property
+    def deferred(self):
+        return self._deferred is not None
+
+    async def _send_deferred(
+        self, content, *, embed, embeds, allowed_mentions, ephemeral, files
+    ):
+        # the library acknowledged the interaction already, so what would
+        # have been the initial response replaces the "thinking" message
+        await self._deferred
+        if files:
+            return await self.followup(
+                content,
+                embed=embed,
+                embeds=embeds,
+                allowed_mentions=allowed_mentions,
+                ephemeral=ephemeral or self._deferred_ephemeral,
+                files=files,
+            )
+
+        return await self.edit_original(
+            content,
+            embeds=[embed] if embed is not None else embeds,
+            allowed_mentions=allowed_mentions,
+        )
+
+    def _callback_route(self):
+        return _InteractionRoute(
+            "POST",
+            "/interactions/{interaction.id}/{interaction.token}/callback",
+            interaction=self.interaction,
+        )
+
+    def _resolve_allowed_mentions(self, allowed_mentions):
+        state = self._state
+        if allowed_mentions is not None:
+            if state.allowed_mentions is not None:
+                return state.allowed_mentions.merge(allowed_mentions).to_dict()
+
+            return allowed_mentions.to_dict()
+
+        return state.allowed_mentions and state.allowed_mentions.to_dict()
+
+    def _message_payload(self, content, *, tts, embed, embeds, allowed_mentions):
+        if embed and embeds:
+            raise RuntimeError("Both 'embed' and 'embeds' are specified.")
+
+        if embed is not None:
+            embeds = [embed]
+
+        return dict(
+            content=content,
+            embeds=[embed.to_dict() for embed in embeds],
+            allowed_mentions=self._resolve_allowed_mentions(allowed_mentions),
+            tts=tts,
+        )
+
+    def _webhook_route(self, method, path=""):
+        return _InteractionRoute(
+            method,
+            "/webhooks/{application_id}/{interaction.token}" + path,
+            interaction=self.interaction,
+            application_id=self.bot.slash_application_id or self.bot.user.id,
+        )
+
+    async def _request(self, r, json, files=None):
+        try:
+            if files:
+                # the body rewinds its sources on every attempt, so files
+                # aren't handed to the client
+                kwargs = dict(data=multipart_body(json, files, self.upload_limit))
+            else:
+                kwargs = dict(json=json)
+
+            return await self._state.http.request(r, **kwargs)
+        finally:
+            if files:
+                for file in files:
+                    file.close()
 
     def send(
         self,
@@ -106,64 +345,47 @@ class SlashContext:
         file=None,
         files=[],
     ):
-        state = self._state
-        if embed and embeds:
-            raise RuntimeError("Both 'embed' and 'embeds' are specified.")
-
         if file and files:
             raise RuntimeError("Both 'file' and 'files' are specified.")
 
-        if embed is not None:
-            embeds = [embed]
+        if file:
+            files = [file]
 
-        embeds = [embed.to_dict() for embed in embeds]
+        if type is not None:
+            if self._inline is not None and files and self._deferred is None:
+                # a multipart body can't be the HTTP reply
+                self._auto_defer(ephemeral)
 
-        if allowed_mentions is not None:
-            if state.allowed_mentions is not None:
-                allowed_mentions = state.allowed_mentions.merge(
-                    allowed_mentions
-                ).to_dict()
-            else:
-                allowed_mentions = allowed_mentions.to_dict()
-        else:
-            allowed_mentions = (
-                state.allowed_mentions and state.allowed_mentions.to_dict()
-            )
+            if self._deferred is not None:
+                if ephemeral and not self._deferred_ephemeral:
+                    # the deferred message is public and can't be made private
+                    raise RuntimeError(
+                        "The response was deferred publicly, "
+                        "pass 'ephemeral' to the command to defer it ephemerally."
+                    )
 
-        r = Route(
-            "POST",
-            "/interactions/{interaction.id}/{interaction.token}/callback"
-            if type is not None
-            else "/webhooks/{application_id}/{interaction.token}",
-            interaction=self.interaction,
-            application_id=self.bot.user.id,
-        )
+                return self._send_deferred(
+                    content,
+                    embed=embed,
+                    embeds=embeds,
+                    allowed_mentions=allowed_mentions,
+                    ephemeral=ephemeral,
+                    files=files,
+                )
 
-        if file:
-            files = [file]
+            self._mark_responded()
 
-        json = dict(
-            content=content,
+        json = self._message_payload(
+            content,
+            tts=tts,
+            embed=embed,
             embeds=embeds,
             allowed_mentions=allowed_mentions,
-            tts=tts,
         )
-        kwargs = {}
-        if files:
-            form = aiohttp.FormData()
-            form.add_field("payload_json", utils.to_json(json))
-            multiple_files = len(files) > 1
-            for idx, file in enumerate(files):
-                name = f"file{idx if multiple_files else ''}"
-                form.add_field(
-                    name,
-                    file.fp,
-                    filename=file.filename,
-                    content_type="application/octet-stream",
-                )
-            kwargs["data"] = form
-            kwargs["files"] = files
-        else:
+
+        r = self._callback_route() if type is not None else self._webhook_route("POST")
+
+        if not files:
             json = dict(
                 type=int(type),
                 data=json,
@@ -171,14 +393,137 @@ class SlashContext:
             if ephemeral:
                 json["data"]["flags"] = 64
 
-            kwargs["json"] = json
+            if self._inline is not None and type is not None:
+                self._inline.set_result(json)
+                return self._inline_sent
 
-        try:
-            return state.http.request(r, **kwargs)
-        finally:
-            if files:
-                for file in files:
-                    file.close()
+        return self._request(r, json, files)
 
     def acknowledge(self):
         return self.send(type=InteractionResponseType.ACKNOWLEDGE)
+
+    def followup(
+        self,
+        content=None,
+        *,
+        tts=False,
+        embed=None,
+        embeds=[],
+        allowed_mentions=None,
+        ephemeral=False,
+        file=None,
+        files=[],
+    ):
+        if file and files:
+            raise RuntimeError("Both 'file' and 'files' are specified.")
+
+        json = self._message_payload(
+            content,
+            tts=tts,
+            embed=embed,
+            embeds=embeds,
+            allowed_mentions=allowed_mentions,
+        )
+        if ephemeral:
+            json["flags"] = 64
+
+        return self._request(
+            self._webhook_route("POST"), json, [file] if file else files
+        )
+
+    def edit_original(
+        self,
+        content=_missing,
+        *,
+        embed=_missing,
+        embeds=_missing,
+        allowed_mentions=_missing,
+    ):
+        if embed is not _missing and embeds is not _missing:
+            raise RuntimeError("Both 'embed' and 'embeds' are specified.")
+
+        json = {}
+        if content is not _missing:
+            json["content"] = content
+
+        if embed is not _missing:
+            embeds = [] if embed is None else [embed]
+
+        if embeds is not _missing:
+            json["embeds"] = [embed.to_dict() for embed in embeds]
+
+        if allowed_mentions is not _missing:
+            json["allowed_mentions"] = self._resolve_allowed_mentions(allowed_mentions)
+
+        if self._edits is None:
+            self._edits = _CoalescingQueue(
+                self.bot.loop,
+                lambda json: self._request(
+                    self._webhook_route("PATCH", "/messages/@original"), json
+                ),
+            )
+
+        return self._edits.submit(json)
+
+    async def delete_original(self):
+        if self._edits is not None:
+            self._edits.cancel()
+
+        await self._state.http.request(
+            self._webhook_route("DELETE", "/messages/@original")
+        )
+
+    @property
+    def collapsed_edits(self):
+        return self._edits.collapsed if self._edits is not None else 0
+
+
+class _CoalescingQueue:
+    # edits submitted while one is in flight (or waiting on the rate limit)
+    # are merged and sent as a single request once it completes
+    def __init__(self, loop, request):
+        self._loop = loop
+        self._request = request
+        self._pending = None
+        self._waiters = []
+        self._task = None
+        self.collapsed = 0
+
+    def submit(self, json):
+        if self._pending is None:
+            self._pending = json
+        else:
+            self._pending.update(json)
+            self.collapsed += 1
+
+        future = self._loop.create_future()
+        self._waiters.append(future)
+        if self._task is None:
+            self._task = self._loop.create_task(self._run())
+
+        return future
+
+    def cancel(self):
+        self._pending = None
+        for waiter in self._waiters:
+            waiter.cancel()
+
+        self._waiters = []
+
+    async def _run(self):
+        try:
+            while self._pending is not None:
+                json, waiters = self._pending, self._waiters
+                self._pending, self._waiters = None, []
+                try:
+                    result = await self._request(json)
+                except Exception as e:
+                    for waiter in waiters:
+                        if not waiter.done():
+                            waiter.set_exception(e)
+                else:
+                    for waiter in waiters:
+                        if not waiter.done():
+                            waiter.set_result(result)
+        finally:
+            self._task = None
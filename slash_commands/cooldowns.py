@@ -0,0 +1,112 @@
+import time
+from collections import OrderedDict
+
+from discord.enums import Enum
+
+from .core import _setting_decorator
+
+
+class SlashBucketType(Enum):
+    GLOBAL = 0
+    GUILD = 1
+    CHANNEL = 2
+    USER = 3
+
+    def get_key(self, ctx):
+        if self is SlashBucketType.GUILD:
+            return ctx.guild_id or ctx.channel_id
+        elif self is SlashBucketType.CHANNEL:
+            return ctx.channel_id
+        elif self is SlashBucketType.USER:
+            return ctx.interaction.author_id
+
+
+class SlashCommandOnCooldown(Exception):
+    def __init__(self, cooldown, retry_after):
+        self.cooldown = cooldown
+        self.retry_after = retry_after
+        super().__init__(f"You are on cooldown. Try again in {retry_after:.2f}s")
+
+
+class SlashMaxConcurrencyReached(Exception):
+    def __init__(self, number, per):
+        self.number = number
+        self.per = per
+        super().__init__(
+            "Too many people are using this command. "
+            f"It can only be used {number} time(s) per {per.name.lower()} concurrently."
+        )
+
+
+class SlashCooldown:
+    # a token bucket per key, ordered by last use so the ones that have
+    # been idle long enough to refill are dropped from the front
+    def __init__(self, rate, per, type=SlashBucketType.USER):
+        self.rate = rate
+        self.per = per
+        self.type = type
+        self._buckets = OrderedDict()
+
+    def _evict(self, now):
+        buckets = self._buckets
+        while buckets:
+            key = next(iter(buckets))
+            if now - buckets[key][1] < self.per:
+                break
+
+            del buckets[key]
+
+    def update_rate_limit(self, ctx, now=None):
+        now = time.monotonic() if now is None else now
+        self._evict(now)
+
+        key = self.type.get_key(ctx)
+        bucket = self._buckets.pop(key, None)
+        if bucket is None:
+            tokens = self.rate
+        else:
+            tokens = min(
+                self.rate, bucket[0] + (now - bucket[1]) * self.rate / self.per
+            )
+
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) * self.per / self.rate
+
+        self._buckets[key] = (tokens - 1, now)
+
+    def check(self, ctx):
+        if retry_after := self.update_rate_limit(ctx):
+            raise SlashCommandOnCooldown(self, retry_after)
+
+
+class SlashMaxConcurrency:
+    def __init__(self, number, per=SlashBucketType.GLOBAL):
+        self.number = number
+        self.per = per
+        self._counts = {}
+
+    def acquire(self, ctx):
+        key = self.per.get_key(ctx)
+        count = self._counts.get(key, 0)
+        if count >= self.number:
+            raise SlashMaxConcurrencyReached(self.number, self.per)
+
+        self._counts[key] = count + 1
+        return key
+
+    def release(self, key):
+        if count := self._counts[key] - 1:
+            self._counts[key] = count
+        else:
+            del self._counts[key]
+
+
+def cooldown(rate, per, type=SlashBucketType.USER):
+    return _setting_decorator("cooldown", lambda _: SlashCooldown(rate, per, type))
+
+
+def max_concurrency(number, per=SlashBucketType.GLOBAL):
+    return _setting_decorator(
+        "max_concurrency", lambda _: SlashMaxConcurrency(number, per)
+    )
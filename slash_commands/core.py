@@ -1,19 +1,46 @@
 from enum import IntEnum
-from inspect import signature
+from hashlib import blake2b
+from inspect import iscoroutinefunction, signature, _empty
+from operator import attrgetter
+from sys import getsizeof
 from typing import Any, Awaitable, Callable, Optional
+from weakref import WeakValueDictionary
 
+from discord import utils
 from discord.http import Route
 
+from .executors import run_in_executor
+from .resolver import resolvable_annotation
+
+
+def make_fingerprint(fields, *children):
+    # order-insensitive within each list of children, like the payload
+    # comparison Discord's command listing allows
+    h = blake2b(repr(fields).encode(), digest_size=16)
+    for group in children:
+        h.update(b"\0")
+        for fingerprint in sorted(child.fingerprint for child in group):
+            h.update(fingerprint)
+
+    return h.digest()
+
+
+def _invalidating(attr):
+    # settable, but whatever was derived from it has to be rebuilt
+    private = "_" + attr
+
+    def setter(self, value):
+        # first, so immutable types refuse before anything changes
+        self._invalidate()
+        setattr(self, private, value)
+
+    return property(attrgetter(private), setter)
+
 
 def compare_list(a, b):
-    b = b.copy()
-    try:
-        for elem in a:
-            b.remove(elem)
-    except ValueError:
-        return False
-    else:
-        return not b
+    return len(a) == len(b) and sorted(x.fingerprint for x in a) == sorted(
+        x.fingerprint for x in b
+    )
 
 
 class SlashOptionType(IntEnum):
@@ -28,10 +55,12 @@ class SlashOptionType(IntEnum):
 
 
 class _GroupMixin:
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.commands = {}
-        self.options = []
+        self.options = ()
 
     def command(self, name=None, cls=None, **attrs):
         cls = SlashSubCommand if cls is None else cls
@@ -50,17 +79,197 @@ class _GroupMixin:
             ]
             res = cls(func, self, name, **attrs)
             self.commands[name] = res
-            self.options.append(res)
+            self.options = (*self.options, res)
             return res
 
         return decorator
 
 
+class _DispatchEntry:
+    __slots__ = (
+        "path",
+        "root",
+        "command",
+        "subcommand_group",
+        "subcommand",
+        "fill",
+        "converters",
+        "resolvers",
+        "autocompleters",
+        "checks",
+        "auto_defer",
+        "ephemeral",
+        "cooldown",
+        "max_concurrency",
+        "priority",
+    )
+
+    def __init__(self, path, root, command, subcommand_group=None, subcommand=None):
+        self.path = path
+        self.root = root
+        self.command = command
+        self.subcommand_group = subcommand_group
+        self.subcommand = subcommand
+        self.auto_defer = self._inherited("auto_defer")
+        self.ephemeral = self._inherited("ephemeral")
+        self.cooldown = self._inherited("cooldown")
+        self.max_concurrency = self._inherited("max_concurrency")
+        self.priority = self._inherited("priority")
+        self.autocompleters = command.autocompleters
+        # unlike the settings above, checks from every level apply, outermost first
+        nodes = []
+        for node in (root, subcommand_group, command):
+            if node is not None and node not in nodes:
+                nodes.append(node)
+
+        self.checks = tuple(check for node in nodes for check in node.checks)
+
+        parameters = signature(command.callback).parameters
+        options = [
+            option
+            for option in command.options
+            if option.type
+            not in (SlashOptionType.SUB_COMMAND, SlashOptionType.SUB_COMMAND_GROUP)
+        ]
+        self.fill = tuple(
+            option.name
+            for option in options
+            if (param := parameters.get(option.name)) is None or param.default is _empty
+        )
+        # option 6, 7, and 8 return snowflakes
+        self.converters = tuple(
+            (option.name, int) for option in options if option.type > 5
+        )
+        # opt in with the option's resolve, or by annotating the parameter,
+        # e.g. discord.Member
+        self.resolvers = tuple(
+            (option.name, annotation)
+            for option in options
+            if option.type > 5
+            and (
+                annotation := option.resolve
+                or (param := parameters.get(option.name)) is not None
+                and resolvable_annotation(param.annotation)
+            )
+        )
+
+    def _inherited(self, attr):
+        for node in (self.command, self.subcommand_group, self.root):
+            if node is not None and (value := getattr(node, attr)) is not None:
+                return value
+
+    def build_kwargs(self, options):
+        kwargs = {option.name: option.value for option in options}
+        for name in self.fill:
+            if name not in kwargs:
+                kwargs[name] = None
+
+        for name, converter in self.converters:
+            if (val := kwargs.get(name)) is not None:
+                kwargs[name] = converter(val)
+
+        return kwargs
+
+
+class DispatchPlan:
+    def __init__(self, command):
+        self.root = (command.name,)
+        self.routes = {self.root: _DispatchEntry(self.root, command, command)}
+
+        for subcommand in command.commands.values():
+            path = self.root + (subcommand.name,)
+            self.routes[path] = _DispatchEntry(
+                path, command, subcommand, subcommand=subcommand
+            )
+
+        for group in command.groups.values():
+            path = self.root + (group.name,)
+            self.routes[path] = _DispatchEntry(
+                path, command, group, subcommand_group=group
+            )
+            for subcommand in group.commands.values():
+                self.routes[path + (subcommand.name,)] = _DispatchEntry(
+                    path + (subcommand.name,),
+                    command,
+                    subcommand,
+                    subcommand_group=group,
+                    subcommand=subcommand,
+                )
+
+    def resolve(self, options):
+        path = self.root
+        entry = self.routes[path]
+        while options and (child := self.routes.get(key := path + (options[0].name,))):
+            path, entry, options = key, child, options[0].options
+
+        return entry, options
+
+
 class _Callable:
+    __slots__ = ()
+
     callback: Callable[..., Awaitable[Any]]
     cog: Optional["SlashCog"]
 
+    def __init__(
+        self,
+        *,
+        auto_defer=None,
+        ephemeral=None,
+        cooldown=None,
+        max_concurrency=None,
+        executor=None,
+        checks=None,
+        priority=None,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        if executor is not None and iscoroutinefunction(self.callback):
+            raise RuntimeError("'executor' requires a synchronous callback")
+
+        # "thread", "process" or a concurrent.futures.Executor
+        self.executor = executor
+        # None defers to the parent command, then to the bot-wide setting
+        self._auto_defer = auto_defer
+        # whether an automatic deferral is only shown to the invoker
+        self._ephemeral = ephemeral
+        self._cooldown = cooldown or getattr(self.callback, "__slash_cooldown__", None)
+        self._max_concurrency = max_concurrency or getattr(
+            self.callback, "__slash_max_concurrency__", None
+        )
+        # LOW is 0, so no "or" here
+        self._priority = (
+            priority
+            if priority is not None
+            else getattr(self.callback, "__slash_priority__", None)
+        )
+        self.autocompleters = {}
+        self._checks = tuple(checks or getattr(self.callback, "__slash_checks__", ()))
+
+    # compiled into the dispatch plan, so changing one rebuilds it
+    auto_defer = _invalidating("auto_defer")
+    ephemeral = _invalidating("ephemeral")
+    cooldown = _invalidating("cooldown")
+    max_concurrency = _invalidating("max_concurrency")
+    priority = _invalidating("priority")
+    checks = _invalidating("checks")
+
+    def autocompleter(self, option, provider=None):
+        # provider is a PrefixIndex or a coroutine taking (ctx, value), or
+        # (self, ctx, value) when it's defined on the command's cog
+        if not any(o.name == option and o.autocomplete for o in self.options):
+            raise RuntimeError(f"{option} isn't an option with autocomplete enabled")
+
+        def decorator(provider):
+            self.autocompleters[option] = provider
+            return provider
+
+        return decorator(provider) if provider is not None else decorator
+
     def __call__(self, *args, **kwargs):
+        if self.executor is not None:
+            return run_in_executor(self, *args, **kwargs)
+
         if self.cog:
             args = list(args)
             args.insert(0, self.cog)
@@ -68,7 +277,48 @@ class _Callable:
         return self.callback(*args, **kwargs)
 
 
+def _setting_decorator(attr, update):
+    # for decorators that go above or below the command decorator; below,
+    # the value waits on the function as __slash_<attr>__ for
+    # _Callable.__init__ to pick up
+    def decorator(func):
+        if isinstance(func, _Callable):
+            setattr(func, attr, update(getattr(func, attr)))
+        else:
+            name = f"__slash_{attr}__"
+            setattr(func, name, update(getattr(func, name, None)))
+
+        return func
+
+    return decorator
+
+
 class SlashCommand(_GroupMixin, _Callable):
+    __slots__ = (
+        "callback",
+        "ids",
+        "application_id",
+        "_name",
+        "_description",
+        "cog",
+        "groups",
+        "commands",
+        "_options",
+        "_plan",
+        "_fingerprint",
+        "_payload",
+        "_payload_bytes",
+        "_auto_defer",
+        "_ephemeral",
+        "_cooldown",
+        "_max_concurrency",
+        "executor",
+        "autocompleters",
+        "_checks",
+        "_priority",
+        "guild_ids",
+    )
+
     def __init__(
         self,
         callback,
@@ -79,15 +329,22 @@ class SlashCommand(_GroupMixin, _Callable):
         description,
         options=[],
         cog=None,
+        guild_ids=None,
+        **kwargs,
     ):
-        super().__init__()
         self.callback = callback
-        self.id = id
+        super().__init__(**kwargs)
+        # the command has a different ID in every guild it's created in,
+        # keyed by guild ID with None for the global one
+        self.ids = {} if id is None else {None: id}
+        # None registers the command globally
+        self.guild_ids = guild_ids if guild_ids is None else tuple(guild_ids)
         self.application_id = application_id
         self.name = name if name else callback.__name__
         self.description = description
         self.cog = cog
         self.groups = {}
+        self._plan = None
 
         params = list(signature(callback).parameters.values())
         if not params:
@@ -106,34 +363,91 @@ class SlashCommand(_GroupMixin, _Callable):
         return (
             isinstance(other, SlashCommand)
             and self.application_id == other.application_id
-            and self.name == other.name
-            and self.description == other.description
-            and compare_list(self.options, other.options)
+            and self.fingerprint == other.fingerprint
         )
 
     def __hash__(self):
         return hash(self.name)
 
-    def to_dict(self, with_id=True):
+    name = _invalidating("name")
+    description = _invalidating("description")
+
+    @property
+    def id(self):
+        return self.ids.get(None)
+
+    @id.setter
+    def id(self, value):
+        self.ids[None] = value
+
+    @property
+    def options(self):
+        return self._options
+
+    @options.setter
+    def options(self, value):
+        # a tuple, so adding one goes through here and invalidates
+        self._options = tuple(intern_option(option) for option in value)
+        self._invalidate()
+
+    @property
+    def fingerprint(self):
+        if self._fingerprint is None:
+            self._fingerprint = make_fingerprint(
+                (self.name, self.description), self.options
+            )
+
+        return self._fingerprint
+
+    def _invalidate(self):
+        self._plan = None
+        self._fingerprint = None
+        self._payload = None
+        self._payload_bytes = None
+
+    @property
+    def plan(self):
+        if self._plan is None:
+            self._plan = DispatchPlan(self)
+
+        return self._plan
+
+    def compile(self):
+        self._plan = DispatchPlan(self)
+        return self._plan
+
+    def to_dict(self, with_id=True, guild_id=None):
         if not self.application_id:
             raise RuntimeError("'application_id' is None")
 
-        d = dict(
-            name=self.name,
-            application_id=self.application_id,
-            description=self.description,
-            options=[option.to_dict() for option in self.options],
-        )
+        # the cached payload is shared, callers mustn't mutate it
+        d = self._payload
+        if d is None or d["application_id"] != self.application_id:
+            self._payload_bytes = None
+            d = self._payload = dict(
+                name=self.name,
+                application_id=self.application_id,
+                description=self.description,
+                options=[option.to_dict() for option in self.options],
+            )
 
-        if self.id and with_id:
-            d["id"] = self.id
+        if with_id and (id := self.ids.get(guild_id)):
+            return dict(d, id=id)
 
         return d
 
+    def to_bytes(self):
+        d = self.to_dict(with_id=False)
+        if self._payload_bytes is None:
+            self._payload_bytes = utils.to_json(d).encode()
+
+        return self._payload_bytes
+
     def group(self, name=None, cls=None, **attrs):
         cls = SlashSubCommandGroup if cls is None else cls
 
         def decorator(func):
+            nonlocal name
             name = name or func.__name__
             params = list(signature(func).parameters.values())
             if not params:
@@ -146,7 +460,7 @@ class SlashCommand(_GroupMixin, _Callable):
             ]
             res = cls(func, self, name, **attrs)
             self.groups[name] = res
-            self.options.append(res)
+            self.options = (*self.options, res)
             return res
 
         return decorator
@@ -173,29 +487,83 @@ class SlashCommand(_GroupMixin, _Callable):
 
 
 class _BaseSlashOption:
+    __slots__ = (
+        "_name",
+        "_description",
+        "_required",
+        "_choices",
+        "_options",
+        "_autocomplete",
+        "_fingerprint",
+    )
     _type = NotImplemented
 
     def __init__(
-        self, name, *, description, required=False, choices=[], options=[], **kwargs
+        self,
+        name,
+        *,
+        description,
+        required=False,
+        choices=[],
+        options=[],
+        autocomplete=False,
+        **kwargs,
     ):
         super().__init__(**kwargs)
-        self.name = name
-        self.description = description
-        self.required = required
-        self.choices = choices
-        self.options = options
+        if autocomplete and choices:
+            raise RuntimeError("Both 'choices' and 'autocomplete' are specified.")
+
+        self._name = name
+        self._description = description
+        self._required = required
+        self._choices = tuple(choices)
+        self._options = tuple(intern_option(option) for option in options)
+        self._autocomplete = autocomplete
+        self._fingerprint = None
+
+    name = _invalidating("name")
+    description = _invalidating("description")
+    required = _invalidating("required")
+    choices = _invalidating("choices")
+    autocomplete = _invalidating("autocomplete")
+
+    @property
+    def options(self):
+        return self._options
+
+    @options.setter
+    def options(self, value):
+        self._invalidate()
+        self._options = tuple(intern_option(option) for option in value)
 
     @property
     def type(self):
         return self._type
 
+    def _invalidate(self):
+        self._fingerprint = None
+
+    @property
+    def fingerprint(self):
+        if self._fingerprint is None:
+            self._fingerprint = make_fingerprint(
+                (
+                    int(self.type),
+                    self.name,
+                    self.description,
+                    self.required,
+                    self.autocomplete,
+                ),
+                self.choices,
+                self.options,
+            )
+
+        return self._fingerprint
+
     def __eq__(self, other):
         return (
             isinstance(other, _BaseSlashOption)
-            and self.name == other.name
-            and self.required == other.required
-            and compare_list(self.choices, other.choices)
-            and compare_list(self.options, other.options)
+            and self.fingerprint == other.fingerprint
         )
 
     def to_dict(self):
@@ -212,6 +580,9 @@ class _BaseSlashOption:
         if self.options:
             d["options"] = [option.to_dict() for option in self.options]
 
+        if self.autocomplete:
+            d["autocomplete"] = True
+
         return d
 
     @classmethod
@@ -236,6 +607,7 @@ class _BaseSlashOption:
             required=required,
             choices=choices,
             options=options,
+            autocomplete=data.get("autocomplete", False),
         )
 
     def __str__(self):
@@ -243,10 +615,26 @@ class _BaseSlashOption:
 
 
 class SlashOption(_BaseSlashOption):
-    def __init__(self, *args, type: SlashOptionType, **kwargs):
+    __slots__ = ("_type", "_resolve", "__weakref__")
+
+    def __init__(self, *args, type: SlashOptionType, resolve=None, **kwargs):
+        # what the snowflake is resolved to before the callback, e.g.
+        # discord.Member; not part of the payload
+        self._resolve = None
+        if resolve is not None:
+            self._resolve = type > 5 and resolvable_annotation(resolve)
+            if not self._resolve:
+                raise RuntimeError(f"{type!r} options can't be resolved to {resolve!r}")
+
         self._type = type
         super().__init__(*args, **kwargs)
 
+    resolve = _invalidating("resolve")
+
+    def _invalidate(self):
+        # instances are shared through intern_option
+        raise RuntimeError("SlashOption is immutable, create a new one instead")
+
     @classmethod
     def string(cls, *args, **kwargs):
         return cls(type=SlashOptionType.STRING, *args, **kwargs)
@@ -273,29 +661,71 @@ class SlashOption(_BaseSlashOption):
 
 
 class _BaseChild(_BaseSlashOption, _Callable):
+    __slots__ = (
+        "callback",
+        "parent",
+        "_auto_defer",
+        "_ephemeral",
+        "_cooldown",
+        "_max_concurrency",
+        "executor",
+        "autocompleters",
+        "_checks",
+        "_priority",
+    )
+
     def __init__(self, callback, parent, name=None, *args, **kwargs):
         self.callback = callback
         self.parent = parent
-        self.name = name or callback.__name__
-        super().__init__(name=self.name, *args, **kwargs)
+        super().__init__(name=name or callback.__name__, *args, **kwargs)
 
     @property
     def cog(self):
         return self.parent.cog
 
+    def _invalidate(self):
+        self._fingerprint = None
+        self.parent._invalidate()
+
 
 class SlashSubCommand(_BaseChild):
+    __slots__ = ()
     _type = SlashOptionType.SUB_COMMAND
 
 
 class SlashSubCommandGroup(_BaseChild, _GroupMixin):
+    __slots__ = ("commands",)
     _type = SlashOptionType.SUB_COMMAND_GROUP
 
 
 class SlashOptionChoice:
-    def __init__(self, name, value):
-        self.name = name
-        self.value = value
+    # equal choices are the same object
+    __slots__ = ("_name", "_value", "_fingerprint", "__weakref__")
+    _interned = WeakValueDictionary()
+
+    def __new__(cls, name, value):
+        key = (cls, name, type(value), value)
+        self = cls._interned.get(key)
+        if self is None:
+            self = cls._interned[key] = super().__new__(cls)
+            self._name = name
+            self._value = value
+            self._fingerprint = None
+
+        return self
+
+    name = _invalidating("name")
+    value = _invalidating("value")
+
+    def _invalidate(self):
+        raise RuntimeError("SlashOptionChoice is immutable, create a new one instead")
+
+    @property
+    def fingerprint(self):
+        if self._fingerprint is None:
+            self._fingerprint = make_fingerprint((self.name, self.value))
+
+        return self._fingerprint
 
     def to_dict(self):
         return dict(name=self.name, value=self.value)
@@ -303,10 +733,12 @@ class SlashOptionChoice:
     def __eq__(self, other):
         return (
             isinstance(other, SlashOptionChoice)
-            and self.name == other.name
-            and self.value == other.value
+            and self.fingerprint == other.fingerprint
         )
 
+    def __hash__(self):
+        return hash((self.name, self.value))
+
     @classmethod
     def from_json(cls, data):
         name = data["name"]
@@ -314,6 +746,92 @@ class SlashOptionChoice:
         return cls(name, value)
 
 
+_interned_options = WeakValueDictionary()
+
+
+def intern_option(option):
+    if not isinstance(option, SlashOption):
+        return option
+
+    # choices and nested options are interned already, so identity is enough
+    key = (
+        type(option),
+        int(option.type),
+        option.name,
+        option.description,
+        option.required,
+        option.autocomplete,
+        option.resolve,
+        tuple(map(id, option.choices)),
+        tuple(map(id, option.options)),
+    )
+    return _interned_options.setdefault(key, option)
+
+
+_MEMORY_ATTRS = (
+    "ids",
+    "name",
+    "description",
+    "value",
+    "choices",
+    "options",
+    "commands",
+    "groups",
+)
+
+
+def _collect_sizes(obj, sizes):
+    if id(obj) in sizes:
+        return
+
+    sizes[id(obj)] = getsizeof(obj)
+    if isinstance(obj, (SlashCommand, _BaseSlashOption, SlashOptionChoice)):
+        for attr in _MEMORY_ATTRS:
+            if (value := getattr(obj, attr, None)) is not None:
+                _collect_sizes(value, sizes)
+    elif isinstance(obj, (list, tuple)):
+        for item in obj:
+            _collect_sizes(item, sizes)
+    elif isinstance(obj, dict):
+        for item in obj.values():
+            _collect_sizes(item, sizes)
+
+
+def memory_report(commands):
+    per_command = {}
+    owners = {}
+    seen = set()
+    for command in commands:
+        # a guild command is listed once for every guild it's in
+        if id(command) in seen:
+            continue
+
+        seen.add(id(command))
+        key = command.name
+        if command.guild_ids is not None:
+            key = f"{key}@{','.join(map(str, command.guild_ids))}"
+
+        sizes = per_command[key] = {}
+        _collect_sizes(command, sizes)
+        for key in sizes:
+            owners[key] = owners.get(key, 0) + 1
+
+    total = {}
+    for sizes in per_command.values():
+        total.update(sizes)
+
+    return dict(
+        commands={
+            name: dict(
+                total=sum(sizes.values()),
+                unique=sum(size for key, size in sizes.items() if owners[key] == 1),
+            )
+            for name, sizes in per_command.items()
+        },
+        total=sum(total.values()),
+    )
+
+
 def slash_command(name=None, cls=SlashCommand, **attrs):
     def decorator(func):
         return cls(func, name, **attrs)
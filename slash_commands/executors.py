@@ -0,0 +1,78 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from importlib import import_module
+
+_process_pool = None
+
+
+class SlashContextSnapshot:
+    # the picklable part of a SlashContext handed to process pool callbacks
+    def __init__(self, ctx):
+        self.interaction_id = ctx.interaction.id
+        self.token = ctx.interaction.token
+        self.guild_id = ctx.guild_id
+        self.channel_id = ctx.channel_id
+        self.author_id = ctx.interaction.author_id
+        self.command = ctx.command.name
+        self.invoked_subcommand_group = (
+            ctx.invoked_subcommand_group and ctx.invoked_subcommand_group.name
+        )
+        self.invoked_subcommand = ctx.invoked_subcommand and ctx.invoked_subcommand.name
+
+
+def get_executor(executor):
+    global _process_pool
+
+    if executor == "thread":
+        return None  # the loop's default executor
+
+    if executor == "process":
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor()
+
+        return _process_pool
+
+    return executor
+
+
+def _call_by_name(module, qualname, *args, **kwargs):
+    # the decorated name points at the command rather than the function,
+    # so the callback is looked up again on the worker's side
+    obj = import_module(module)
+    for attr in qualname.split("."):
+        obj = getattr(obj, attr)
+
+    return getattr(obj, "callback", obj)(*args, **kwargs)
+
+
+async def run_in_executor(command, ctx, *args, **kwargs):
+    executor = get_executor(command.executor)
+    callback = command.callback
+
+    if isinstance(executor, ProcessPoolExecutor):
+        if command.cog:
+            raise RuntimeError(
+                f"{command.name} is a cog method and can't run in a process pool"
+            )
+
+        func = partial(
+            _call_by_name,
+            callback.__module__,
+            callback.__qualname__,
+            SlashContextSnapshot(ctx),
+            *args,
+            **kwargs,
+        )
+    elif command.cog:
+        func = partial(callback, command.cog, ctx, *args, **kwargs)
+    else:
+        func = partial(callback, ctx, *args, **kwargs)
+
+    result = await ctx.bot.loop.run_in_executor(executor, func)
+    if result is not None:
+        if isinstance(result, dict):
+            await ctx.send(**result)
+        else:
+            await ctx.send(result)
+
+    return result
@@ -1,11 +1,14 @@
+from time import perf_counter
+
 from discord.enums import Enum, try_enum
 from discord.utils import _get_as_snowflake
-from discord import User, Member
+from discord import Member
 
 
 class InteractionType(Enum):
     PING = 1
     APPLICATION_COMMAND = 2
+    APPLICATION_COMMAND_AUTOCOMPLETE = 4
 
 
 class InteractionResponseType(Enum):
@@ -14,51 +17,132 @@ class InteractionResponseType(Enum):
     CHANNEL_MESSAGE = 3
     CHANNEL_MESSAGE_WITH_SOURCE = 4
     DEFFERED_CHANNEL_MESSAGE_WITH_SOURCE = 5
+    APPLICATION_COMMAND_AUTOCOMPLETE_RESULT = 8
 
     def __int__(self):
         return self.value
 
 
+_missing = object()
+
+member_cache_stats = dict(hits=0, misses=0)
+
+
 class Interaction:
+    __slots__ = (
+        "_state",
+        "_payload",
+        "_author",
+        "id",
+        "type",
+        "data",
+        "guild_id",
+        "channel_id",
+        "token",
+        "version",
+        "received_at",
+        "parse_time",
+    )
+
     def __init__(self, *, state, data):
+        self.received_at = perf_counter()
         self._state = state
+        self._payload = data
+        self._author = _missing
         self.id = int(data["id"])
         self.type = try_enum(InteractionType, data["type"])
         self.data = "data" in data and InteractionData(data["data"])
         self.guild_id = _get_as_snowflake(data, "guild_id")
         self.channel_id = _get_as_snowflake(data, "channel_id")
-        self.author = (
-            (
-                "member" in data
-                and Member(data=data["member"], guild=guild, state=state)
-                if (guild := state._get_guild(self.guild_id))
-                else User(state=state, data=data["member"]["user"])
-            )
-            or "user" in data
-            and User(state=state, data=data["user"])
-        )
         self.token = data["token"]
         self.version = data["version"]
+        self.parse_time = perf_counter() - self.received_at
+
+    @property
+    def author(self):
+        if self._author is _missing:
+            self._author = self._resolve_author()
+
+        return self._author
+
+    @property
+    def author_id(self):
+        # read straight from the payload so that keying on the author
+        # doesn't build the Member
+        data = self._payload
+        user = data["member"]["user"] if "member" in data else data.get("user")
+        return user and int(user["id"])
+
+    def _resolve_author(self):
+        data = self._payload
+        state = self._state
+        if "member" in data:
+            member_data = data["member"]
+            if guild := state._get_guild(self.guild_id):
+                member = guild.get_member(int(member_data["user"]["id"]))
+                if member is None:
+                    member_cache_stats["misses"] += 1
+                    return Member(data=member_data, guild=guild, state=state)
+
+                # same object the gateway events keep up to date, so changes
+                # are dispatched the way GUILD_MEMBER_UPDATE would; copying
+                # is left to the rare case where something did change
+                member_cache_stats["hits"] += 1
+                before = None
+                if member_data.get("nick", member.nick) != member.nick or sorted(
+                    map(int, member_data.get("roles", ()))
+                ) != list(member._roles):
+                    before = Member._copy(member)
+
+                member._update(member_data)
+                if user_update := member._update_inner_user(member_data["user"]):
+                    state.dispatch("user_update", *user_update)
+
+                if before is not None:
+                    state.dispatch("member_update", before, member)
+
+                return member
+
+            return state.store_user(member_data["user"])
+
+        return "user" in data and state.store_user(data["user"])
 
 
 class _BaseOptions:
+    __slots__ = ("_raw_options", "_options")
+
     def __init__(self, data):
-        self.options = (
-            "options" in data
-            and [InteractionDataOption(option) for option in data["options"]]
-            or []
-        )
+        self._raw_options = data.get("options")
+        self._options = None
+
+    @property
+    def options(self):
+        if self._options is None:
+            self._options = (
+                self._raw_options
+                and [InteractionDataOption(option) for option in self._raw_options]
+                or []
+            )
+
+        return self._options
 
 
 class InteractionData(_BaseOptions):
+    __slots__ = ("id", "name", "resolved")
+
     def __init__(self, data):
         super().__init__(data)
         self.id = int(data["id"])
         self.name = data["name"]
+        # raw users, members, roles and channels the options refer to
+        self.resolved = data.get("resolved", {})
 
 
 class InteractionDataOption(_BaseOptions):
+    __slots__ = ("name", "value", "focused")
+
     def __init__(self, data):
         super().__init__(data)
         self.name = data["name"]
         self.value = data.get("value")
+        self.focused = data.get("focused", False)
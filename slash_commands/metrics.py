@@ -0,0 +1,152 @@
+from bisect import bisect_left
+
+from .interaction import member_cache_stats
+
+# upper bounds in seconds, 3.0 being Discord's response deadline
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.0,
+    3.0,
+    5.0,
+    10.0,
+)
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = bounds
+        # the last bucket is +Inf
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def to_dict(self):
+        return dict(
+            buckets=dict(zip((*self.bounds, float("inf")), self.counts)),
+            sum=self.sum,
+            count=self.count,
+        )
+
+
+class CommandMetrics:
+    __slots__ = ("invocations", "errors", "shed", "phases")
+
+    PHASES = ("parse", "dispatch", "callback", "first_response")
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.invocations = 0
+        self.errors = 0
+        self.shed = 0
+        self.phases = {phase: Histogram(bounds) for phase in self.PHASES}
+
+    def to_dict(self):
+        return dict(
+            invocations=self.invocations,
+            errors=self.errors,
+            shed=self.shed,
+            **{phase: h.to_dict() for phase, h in self.phases.items()},
+        )
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class SlashMetrics:
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.commands = {}
+
+    def get(self, path):
+        if (metrics := self.commands.get(path)) is None:
+            metrics = self.commands[path] = CommandMetrics(self.bounds)
+
+        return metrics
+
+    def observe(self, path, phase, seconds):
+        self.get(path).phases[phase].observe(seconds)
+
+    def record_invocation(self, path, *, parse, dispatch, callback, failed):
+        metrics = self.get(path)
+        metrics.invocations += 1
+        if failed:
+            metrics.errors += 1
+
+        metrics.phases["parse"].observe(parse)
+        if dispatch is not None:
+            metrics.phases["dispatch"].observe(dispatch)
+
+        if callback is not None:
+            metrics.phases["callback"].observe(callback)
+
+    def snapshot(self):
+        return {" ".join(path): m.to_dict() for path, m in self.commands.items()}
+
+    def to_prometheus(self, prefix="slash_command"):
+        lines = []
+        for name, attr in (
+            ("invocations", "invocations"),
+            ("errors", "errors"),
+            ("shed", "shed"),
+        ):
+            metric = f"{prefix}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for path, m in self.commands.items():
+                label = _escape(" ".join(path))
+                lines.append(f'{metric}{{command="{label}"}} {getattr(m, attr)}')
+
+        for phase in CommandMetrics.PHASES:
+            metric = f"{prefix}_{phase}_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            for path, m in self.commands.items():
+                label = _escape(" ".join(path))
+                h = m.phases[phase]
+                cumulative = 0
+                for bound, count in zip((*h.bounds, "+Inf"), h.counts):
+                    cumulative += count
+                    lines.append(
+                        f'{metric}_bucket{{command="{label}",le="{bound}"}} {cumulative}'
+                    )
+
+                lines.append(f'{metric}_sum{{command="{label}"}} {h.sum}')
+                lines.append(f'{metric}_count{{command="{label}"}} {h.count}')
+
+        for name, count in member_cache_stats.items():
+            metric = f"{prefix}_member_cache_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {count}")
+
+        return "\n".join(lines) + "\n"
+
+    async def start_server(self, host="127.0.0.1", port=9100, path="/metrics"):
+        from aiohttp import web
+
+        async def handler(request):
+            return web.Response(
+                body=self.to_prometheus().encode(),
+                headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+            )
+
+        app = web.Application()
+        app.router.add_get(path, handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
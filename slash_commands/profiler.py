@@ -0,0 +1,171 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import time
+from time import perf_counter
+
+log = logging.getLogger(__name__)
+
+# what _write names reports, anything else in the directory is left alone
+_REPORT_NAME = re.compile(r"\d{4,}\.json")
+
+
+class _Trace:
+    # drives the callback one step at a time, so only the command's own
+    # code is timed and profiled, not whatever else runs while it awaits
+    __slots__ = (
+        "_awaitable",
+        "profile",
+        "block_threshold",
+        "steps",
+        "busy",
+        "blocking",
+    )
+
+    def __init__(self, awaitable, profile, block_threshold):
+        self._awaitable = awaitable
+        self.profile = profile
+        self.block_threshold = block_threshold
+        self.steps = 0
+        self.busy = 0.0
+        self.blocking = []
+
+    def __await__(self):
+        it = self._awaitable.__await__()
+        profile = self.profile
+        value = exc = None
+        while True:
+            started = perf_counter()
+            if profile is not None:
+                profile.enable()
+
+            try:
+                yielded = it.send(value) if exc is None else it.throw(exc)
+            except StopIteration as e:
+                return e.value
+            finally:
+                if profile is not None:
+                    profile.disable()
+
+                elapsed = perf_counter() - started
+                self.busy += elapsed
+                if elapsed >= self.block_threshold:
+                    self.blocking.append(dict(step=self.steps, seconds=elapsed))
+
+                self.steps += 1
+
+            try:
+                value, exc = (yield yielded), None
+            except BaseException as e:
+                value, exc = None, e
+
+
+class SlashProfiler:
+    # every invocation is timed per step; a slow one is written out and
+    # arms full profiling for the next few calls of the same command
+    def __init__(
+        self,
+        directory,
+        *,
+        threshold=1.0,
+        thresholds=None,
+        block_threshold=0.1,
+        profile_next=5,
+        sample_rate=0.0,
+        max_reports=100,
+        top=30,
+    ):
+        self.directory = directory
+        self.threshold = threshold
+        # keyed by the command path, e.g. "admin roles add"
+        self.thresholds = thresholds or {}
+        self.block_threshold = block_threshold
+        self.profile_next = profile_next
+        self.sample_rate = sample_rate
+        self.max_reports = max_reports
+        self.top = top
+        self._armed = {}
+
+        os.makedirs(directory, exist_ok=True)
+        reports = sorted(
+            (
+                entry
+                for entry in os.scandir(directory)
+                if _REPORT_NAME.fullmatch(entry.name)
+            ),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        self._next = (int(reports[-1].name[:-5]) + 1) % max_reports if reports else 0
+
+    def trace(self, ctx, awaitable):
+        path = ctx.command_path
+        profile = None
+        if armed := self._armed.get(path):
+            profile = cProfile.Profile()
+            if armed > 1:
+                self._armed[path] = armed - 1
+            else:
+                del self._armed[path]
+        elif self.sample_rate and random.random() < self.sample_rate:
+            profile = cProfile.Profile()
+
+        return _Trace(awaitable, profile, self.block_threshold)
+
+    def finish(self, ctx, trace, *, started, callback_started, callback_ended, failed):
+        received = ctx.interaction.received_at
+        path = " ".join(ctx.command_path)
+        total = callback_ended - received
+        if total < self.thresholds.get(path, self.threshold) and not trace.blocking:
+            return
+
+        if trace.profile is None:
+            self._armed[ctx.command_path] = self.profile_next
+
+        report = dict(
+            command=path,
+            interaction_id=ctx.interaction.id,
+            time=time.time(),
+            failed=failed,
+            total=total,
+            # seconds since the payload was received
+            timestamps=dict(
+                parsed=ctx.interaction.parse_time,
+                invoked=started - received,
+                callback_started=callback_started - received,
+                callback_ended=callback_ended - received,
+                first_response=ctx._responded_at and ctx._responded_at - received,
+            ),
+            steps=trace.steps,
+            busy=trace.busy,
+            blocking=trace.blocking,
+            profile=trace.profile and self._format_profile(trace.profile),
+        )
+        ctx.bot.dispatch("slash_slow_invocation", ctx, report)
+        future = ctx.bot.loop.run_in_executor(None, self._write, self._next, report)
+        future.add_done_callback(self._written)
+        self._next = (self._next + 1) % self.max_reports
+
+    def _format_profile(self, profile):
+        stream = io.StringIO()
+        pstats.Stats(profile, stream=stream).sort_stats("cumulative").print_stats(
+            self.top
+        )
+        return stream.getvalue()
+
+    @staticmethod
+    def _written(future):
+        if not future.cancelled() and (error := future.exception()) is not None:
+            log.error("Failed to write a slow invocation report", exc_info=error)
+
+    def _write(self, index, report):
+        path = os.path.join(self.directory, f"{index:04d}.json")
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(report, f, indent=2)
+
+        os.replace(tmp, path)
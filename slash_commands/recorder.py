@@ -0,0 +1,159 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .core import SlashOptionType
+
+log = logging.getLogger(__name__)
+
+_SNOWFLAKE_OPTIONS = (
+    SlashOptionType.USER,
+    SlashOptionType.CHANNEL,
+    SlashOptionType.ROLE,
+)
+
+
+class InteractionRecorder:
+    # one gzip member per flush, appended, so a crash loses at most the
+    # unflushed tail and the file stays readable as a whole
+    def __init__(self, path, *, anonymize=False, key=None, flush_every=100):
+        self.path = path
+        self.anonymize = anonymize
+        self.key = key if key is not None else os.urandom(16)
+        self.flush_every = flush_every
+        self.recorded = 0
+        self._buffer = []
+        # a single thread, so appends land in order and off the event loop
+        self._writer = ThreadPoolExecutor(1, thread_name_prefix="recorder")
+
+    def _snowflake(self, value):
+        digest = hashlib.blake2b(str(value).encode(), key=self.key, digest_size=8)
+        return str(int.from_bytes(digest.digest(), "big") >> 1)
+
+    def _anonymize_user(self, user):
+        return dict(
+            user,
+            id=self._snowflake(user["id"]),
+            username="user",
+            discriminator="0001",
+            avatar=None,
+        )
+
+    def _anonymize_options(self, options):
+        result = []
+        for option in options:
+            option = dict(option)
+            if "options" in option:
+                option["options"] = self._anonymize_options(option["options"])
+
+            value = option.get("value")
+            if option.get("type") in _SNOWFLAKE_OPTIONS and value is not None:
+                option["value"] = self._snowflake(value)
+            elif isinstance(value, str):
+                # keep the length, it affects payload and response sizes
+                option["value"] = "x" * len(value)
+
+            result.append(option)
+
+        return result
+
+    def _anonymize_resolved(self, resolved):
+        # keyed by the same ids as the option values, so they map alike
+        result = {}
+        for kind, objects in resolved.items():
+            anonymized = result[kind] = {}
+            for snowflake, obj in objects.items():
+                snowflake = self._snowflake(snowflake)
+                if kind == "users":
+                    obj = self._anonymize_user(obj)
+                elif kind == "members":
+                    obj = dict(
+                        obj,
+                        nick=None,
+                        roles=[self._snowflake(role) for role in obj.get("roles", ())],
+                    )
+                else:
+                    obj = dict(obj, id=snowflake, name=kind[:-1])
+
+                anonymized[snowflake] = obj
+
+        return result
+
+    def _anonymized(self, data):
+        # ids map consistently, so per-user and per-guild buckets behave the same
+        data = dict(
+            data, id=self._snowflake(data["id"]), token="0" * len(data["token"])
+        )
+        for key in ("guild_id", "channel_id"):
+            if key in data:
+                data[key] = self._snowflake(data[key])
+
+        if "member" in data:
+            data["member"] = dict(
+                data["member"],
+                user=self._anonymize_user(data["member"]["user"]),
+                nick=None,
+                roles=[
+                    self._snowflake(role) for role in data["member"].get("roles", ())
+                ],
+            )
+
+        if "user" in data:
+            data["user"] = self._anonymize_user(data["user"])
+
+        if "options" in data.get("data", {}):
+            data["data"] = dict(
+                data["data"], options=self._anonymize_options(data["data"]["options"])
+            )
+
+        if "resolved" in data.get("data", {}):
+            data["data"] = dict(
+                data["data"],
+                resolved=self._anonymize_resolved(data["data"]["resolved"]),
+            )
+
+        return data
+
+    def record(self, data):
+        if self.anonymize:
+            data = self._anonymized(data)
+
+        self._buffer.append(
+            json.dumps([time.time(), data], separators=(",", ":")).encode()
+        )
+        self.recorded += 1
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def _write(self, lines):
+        with gzip.open(self.path, "ab") as f:
+            f.write(b"\n".join(lines) + b"\n")
+
+    @staticmethod
+    def _written(future):
+        if (error := future.exception()) is not None:
+            log.error("Failed to write recorded interactions", exc_info=error)
+
+    def flush(self):
+        if not self._buffer:
+            return
+
+        future = self._writer.submit(self._write, self._buffer)
+        future.add_done_callback(self._written)
+        self._buffer = []
+        return future
+
+    def close(self):
+        self.flush()
+        self._writer.shutdown()
+
+
+def read_interactions(path):
+    with gzip.open(path, "rb") as f:
+        for line in f:
+            timestamp, data = json.loads(line)
+            yield timestamp, data
@@ -0,0 +1,67 @@
+from types import MappingProxyType
+
+_EMPTY = MappingProxyType({})
+
+
+class SlashRegistry:
+    # never mutated; a transaction builds the next one and the bot swaps
+    # its reference, so a reader holding a registry always sees it whole
+    __slots__ = ("commands", "guild_commands", "cogs")
+
+    def __init__(self, commands=None, guild_commands=None, cogs=None):
+        self.commands = MappingProxyType(commands or {})
+        if not isinstance(guild_commands, MappingProxyType):
+            guild_commands = MappingProxyType(guild_commands or {})
+
+        self.guild_commands = guild_commands
+        self.cogs = MappingProxyType(cogs or {})
+
+    def get_command(self, name, guild_id=None):
+        if guild_id and (registry := self.guild_commands.get(guild_id)):
+            if command := registry.get(name):
+                return command
+
+        return self.commands.get(name)
+
+    def get_commands(self, guild_id=None):
+        if guild_id:
+            return self.guild_commands.get(guild_id, _EMPTY)
+
+        return self.commands
+
+
+class SlashRegistryTransaction:
+    def __init__(self, registry):
+        self.base = registry
+        self.commands = dict(registry.commands)
+        self.cogs = dict(registry.cogs)
+        # guild registries are only copied once they're touched
+        self._guild_commands = {}
+
+    def _guild(self, guild_id):
+        if (registry := self._guild_commands.get(guild_id)) is None:
+            registry = self._guild_commands[guild_id] = dict(
+                self.base.guild_commands.get(guild_id, _EMPTY)
+            )
+
+        return registry
+
+    def get_commands(self, guild_id=None):
+        return self._guild(guild_id) if guild_id else self.commands
+
+    def registries(self, slash_command):
+        if slash_command.guild_ids is None:
+            return [self.commands]
+
+        return [self._guild(guild_id) for guild_id in slash_command.guild_ids]
+
+    def commit(self):
+        # untouched, so the previous registry's can be shared as is
+        if not self._guild_commands:
+            return SlashRegistry(self.commands, self.base.guild_commands, self.cogs)
+
+        guild_commands = dict(self.base.guild_commands)
+        for guild_id, registry in self._guild_commands.items():
+            guild_commands[guild_id] = MappingProxyType(registry)
+
+        return SlashRegistry(self.commands, guild_commands, self.cogs)
@@ -0,0 +1,155 @@
+import asyncio
+from collections import OrderedDict
+from time import monotonic
+from typing import Union, get_args, get_origin
+
+import discord
+
+RESOLVABLE = (discord.abc.User, discord.abc.GuildChannel, discord.Role)
+
+
+def resolvable_annotation(annotation):
+    # Optional[X] is fine, the option just isn't required
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        annotation = args[0] if len(args) == 1 else None
+
+    if isinstance(annotation, type) and issubclass(annotation, RESOLVABLE):
+        return annotation
+
+
+class SlashResolver:
+    # cache -> recently fetched -> one shared request per id
+    def __init__(self, bot, *, ttl=300.0, max_size=10000):
+        self.bot = bot
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.fetches = 0
+        self._cache = OrderedDict()
+        self._pending = {}
+
+    def _get_cached(self, key):
+        if (cached := self._cache.get(key)) is None:
+            return None
+
+        expires, obj = cached
+        if expires < monotonic():
+            del self._cache[key]
+            return None
+
+        self._cache.move_to_end(key)
+        return obj
+
+    def _store(self, key, obj):
+        self._cache[key] = (monotonic() + self.ttl, obj)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    async def _fetch(self, key, fetch):
+        if (obj := self._get_cached(key)) is not None:
+            self.hits += 1
+            return obj
+
+        task = self._pending.get(key)
+        if task is None:
+
+            async def run():
+                obj = await fetch()
+                self._store(key, obj)
+                return obj
+
+            self.fetches += 1
+            task = self._pending[key] = self.bot.loop.create_task(run())
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+
+        # a cancelled invocation mustn't cancel everyone else's fetch
+        return await asyncio.shield(task)
+
+    # data is what the interaction resolved, used before the TTL cache and
+    # the API; without a gateway cache that's what saves the request
+
+    async def member(self, guild_id, user_id, *, data=None):
+        guild = self.bot.get_guild(guild_id)
+        if guild is None:
+            # without the guild there's nothing to bind a Member to
+            return await self.user(user_id, data=data and data["user"])
+
+        if (member := guild.get_member(user_id)) is not None:
+            return member
+
+        if data is not None:
+            return discord.Member(data=data, guild=guild, state=self.bot._connection)
+
+        return await self._fetch(
+            ("member", guild_id, user_id), lambda: guild.fetch_member(user_id)
+        )
+
+    async def user(self, user_id, *, data=None):
+        if (user := self.bot.get_user(user_id)) is not None:
+            return user
+
+        if data is not None:
+            return self.bot._connection.store_user(data)
+
+        return await self._fetch(
+            ("user", user_id), lambda: self.bot.fetch_user(user_id)
+        )
+
+    async def channel(self, channel_id):
+        if (channel := self.bot.get_channel(channel_id)) is not None:
+            return channel
+
+        return await self._fetch(
+            ("channel", channel_id), lambda: self.bot.fetch_channel(channel_id)
+        )
+
+    async def role(self, guild_id, role_id, *, data=None):
+        guild = self.bot.get_guild(guild_id)
+        if guild is None:
+            return discord.Object(role_id)
+
+        if (role := guild.get_role(role_id)) is not None:
+            return role
+
+        if data is not None:
+            return discord.Role(guild=guild, state=self.bot._connection, data=data)
+
+        async def fetch():
+            roles = await guild.fetch_roles()
+            for role in roles:
+                if role.id != role_id:
+                    self._store(("role", guild_id, role.id), role)
+
+            return discord.utils.get(roles, id=role_id)
+
+        return await self._fetch(("role", guild_id, role_id), fetch)
+
+    async def convert(self, ctx, annotation, value):
+        resolved = ctx.interaction.data.resolved
+        key = str(value)
+        if issubclass(annotation, discord.Role):
+            data = resolved.get("roles", {}).get(key)
+            return await self.role(ctx.guild_id, value, data=data)
+
+        # resolved channels are partial, too little to build one from
+        if issubclass(annotation, discord.abc.GuildChannel):
+            channel = await self.channel(value)
+            if not isinstance(channel, annotation):
+                raise RuntimeError(f"Channel {value} is not a {annotation.__name__}")
+
+            return channel
+
+        user = resolved.get("users", {}).get(key)
+        if issubclass(annotation, discord.Member) and ctx.guild_id:
+            member = resolved.get("members", {}).get(key)
+            data = member and user and dict(member, user=user)
+            return await self.member(ctx.guild_id, value, data=data)
+
+        return await self.user(value, data=user)
+
+    async def resolve(self, ctx, resolvers, options):
+        for name, annotation in resolvers:
+            if (value := options.get(name)) is not None:
+                options[name] = await self.convert(ctx, annotation, value)
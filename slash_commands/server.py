@@ -0,0 +1,132 @@
+import asyncio
+import json
+
+from aiohttp import web
+from discord import utils
+
+from .interaction import Interaction, InteractionType
+
+try:
+    from nacl.exceptions import BadSignatureError
+    from nacl.signing import VerifyKey
+except ImportError:
+    has_nacl = False
+else:
+    has_nacl = True
+
+
+class InteractionServer:
+    # receives interactions as signed HTTP POSTs (the application's
+    # interactions endpoint URL) and answers with the initial response
+    def __init__(self, bot, public_key, *, path="/interactions", timeout=2.5):
+        if not has_nacl:
+            raise RuntimeError("PyNaCl library needed in order to verify interactions")
+
+        self.bot = bot
+        self.verify_key = VerifyKey(bytes.fromhex(public_key))
+        self.path = path
+        self.timeout = timeout
+        self.app = web.Application()
+        self.app.router.add_post(path, self.handle)
+        self._runner = None
+
+    def verify(self, body, signature, timestamp):
+        try:
+            self.verify_key.verify(timestamp.encode() + body, bytes.fromhex(signature))
+        except (BadSignatureError, ValueError):
+            return False
+
+        return True
+
+    async def handle(self, request):
+        body = await request.read()
+        signature = request.headers.get("X-Signature-Ed25519")
+        timestamp = request.headers.get("X-Signature-Timestamp")
+        if not (signature and timestamp and self.verify(body, signature, timestamp)):
+            return web.Response(status=401, text="invalid request signature")
+
+        data = json.loads(body)
+        if data["type"] == InteractionType.PING.value:
+            return web.json_response(dict(type=1))
+
+        interaction = Interaction(state=self.bot._connection, data=data)
+        if interaction.type not in (
+            InteractionType.APPLICATION_COMMAND,
+            InteractionType.APPLICATION_COMMAND_AUTOCOMPLETE,
+        ):
+            return web.Response(status=400)
+
+        autocomplete = (
+            interaction.type is InteractionType.APPLICATION_COMMAND_AUTOCOMPLETE
+        )
+
+        ctx = self.bot.get_slash_context(interaction)
+        if not ctx.command:
+            # nothing would ever answer it
+            return web.Response(status=404)
+
+        admission = None if autocomplete else self.bot.slash_admission
+        if admission is not None and not admission.admit(ctx):
+            return web.Response(
+                body=admission.busy_response, content_type="application/json"
+            )
+
+        inline = ctx._start_inline_response()
+        task = self.bot.loop.create_task(
+            ctx.autocomplete() if autocomplete else ctx.invoke()
+        )
+        if admission is not None:
+            task.add_done_callback(admission.release)
+        await asyncio.wait(
+            {inline, task}, timeout=self.timeout, return_when=asyncio.FIRST_COMPLETED
+        )
+
+        if not inline.done():
+            if autocomplete:
+                # suggestions can't be deferred, late ones are dropped
+                inline.set_result(dict(type=8, data=dict(choices=[])))
+            elif task.done():
+                # failed or returned without responding, nothing would ever
+                # replace a deferral; let Discord show the interaction failed
+                ctx._inline_sent.set_exception(
+                    RuntimeError("the command finished without responding")
+                )
+                ctx._inline_sent.exception()
+                return web.Response(status=500)
+            else:
+                # too slow, later sends edit this instead
+                ctx._auto_defer()
+
+        # followups wait on this, so it has to settle however the write goes
+        try:
+            response = web.Response(
+                body=utils.to_json(inline.result()).encode(),
+                content_type="application/json",
+            )
+            await response.prepare(request)
+            await response.write_eof()
+        except BaseException:
+            ctx._inline_sent.set_exception(
+                RuntimeError("the interaction response could not be sent")
+            )
+            # only raised to whoever awaits it, nothing to log otherwise
+            ctx._inline_sent.exception()
+            raise
+        else:
+            ctx._inline_sent.set_result(None)
+
+        return response
+
+    async def start(self, host="0.0.0.0", port=8080, *, token=None):
+        # with a token, log in over HTTP only so no gateway is needed
+        if token is not None:
+            await self.bot.http.static_login(token, bot=True)
+
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
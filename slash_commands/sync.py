@@ -0,0 +1,133 @@
+import asyncio
+import hashlib
+import json
+import os
+
+
+def hash_slash_commands(commands):
+    h = hashlib.sha256()
+    for command in sorted(commands, key=lambda command: command.name):
+        h.update(command.to_bytes())
+
+    return h.hexdigest()
+
+
+def diff_slash_commands(local, remote, guild_id=None):
+    remote = {command.name: command for command in remote}
+    to_create = []
+    to_edit = []
+
+    for command in local:
+        current = remote.pop(command.name, None)
+        if current is None:
+            to_create.append(command)
+            continue
+
+        command.ids[guild_id] = current.id
+        if command != current:
+            to_edit.append(command)
+
+    return to_create, to_edit, list(remote.values())
+
+
+class SyncManifest:
+    def __init__(self, path):
+        self.path = path
+        self._scopes = {}
+
+        if os.path.exists(path):
+            with open(path) as f:
+                self._scopes = json.load(f)
+
+    @staticmethod
+    def _key(guild_id):
+        return str(guild_id) if guild_id else "global"
+
+    def get_ids(self, guild_id, digest):
+        scope = self._scopes.get(self._key(guild_id))
+        if not scope or scope["hash"] != digest:
+            return None
+
+        return {name: int(id) for name, id in scope["ids"].items()}
+
+    def update(self, guild_id, digest, ids):
+        self._scopes[self._key(guild_id)] = dict(
+            hash=digest, ids={name: str(id) for name, id in ids.items()}
+        )
+
+    def save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self._scopes, f)
+
+        os.replace(tmp, self.path)
+
+
+class GuildSyncScheduler:
+    # overwrites guild command sets with bounded concurrency; guilds whose
+    # manifest entry is current are skipped, so an interrupted run resumes
+    def __init__(self, bot, *, concurrency=8, manifest=None, save_every=50):
+        if isinstance(manifest, str):
+            manifest = SyncManifest(manifest)
+
+        self.bot = bot
+        self.concurrency = concurrency
+        self.manifest = manifest
+        self.save_every = save_every
+        self.total = 0
+        self.done = 0
+        self.skipped = 0
+        self.failed = {}
+        self._unsaved = 0
+
+    async def _sync_guild(self, guild_id):
+        commands = list(self.bot.get_slash_commands(guild_id).values())
+        digest = hash_slash_commands(commands)
+        ids = self.manifest and self.manifest.get_ids(guild_id, digest)
+        if ids is not None and all(command.name in ids for command in commands):
+            for command in commands:
+                command.ids[guild_id] = ids[command.name]
+
+            self.skipped += 1
+            return
+
+        try:
+            data = await self.bot.put_slash_commands(commands, guild_id)
+        except Exception as e:
+            self.failed[guild_id] = e
+            return
+
+        ids = {command["name"]: int(command["id"]) for command in data}
+        for command in commands:
+            command.ids[guild_id] = ids.get(command.name)
+
+        if self.manifest:
+            self.manifest.update(guild_id, digest, ids)
+            self._unsaved += 1
+            if self._unsaved >= self.save_every:
+                self.manifest.save()
+                self._unsaved = 0
+
+    async def run(self, guild_ids=None):
+        if guild_ids is None:
+            guild_ids = list(self.bot.guild_slash_commands)
+
+        self.total = len(guild_ids)
+        pending = iter(guild_ids)
+
+        # discord.py keys rate limit buckets by guild, and waits on them
+        # and on the global limit, so each worker only has to go in turn
+        async def worker():
+            for guild_id in pending:
+                await self._sync_guild(guild_id)
+                self.done += 1
+                self.bot.dispatch("slash_sync_progress", self, guild_id)
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        finally:
+            if self.manifest and self._unsaved:
+                self.manifest.save()
+                self._unsaved = 0
+
+        return self
@@ -0,0 +1,162 @@
+import asyncio
+import mmap
+import os
+
+import aiohttp
+from aiohttp import payload
+from discord import utils
+
+DEFAULT_UPLOAD_LIMIT = 8 * 1024 * 1024
+CHUNK_SIZE = 2**16
+
+
+class SlashFile:
+    # source is a path (memory mapped), an async iterable, or a callable
+    # returning one; only paths and callables can be sent again on a retry
+    def __init__(self, source, filename=None, *, size=None, spoiler=False):
+        if isinstance(source, (str, os.PathLike)):
+            filename = filename or os.path.basename(source)
+        elif filename is None:
+            raise RuntimeError("'filename' is required for streamed sources.")
+
+        if spoiler and not filename.startswith("SPOILER_"):
+            filename = f"SPOILER_{filename}"
+
+        self.source = source
+        self.filename = filename
+        self._size = size
+        self._file = None
+        self._map = None
+        self._consumed = False
+
+    @property
+    def is_path(self):
+        return isinstance(self.source, (str, os.PathLike))
+
+    @property
+    def size(self):
+        if self.is_path:
+            return os.stat(self.source).st_size
+
+        return self._size
+
+    def _open_map(self):
+        self._file = open(self.source, "rb")
+        if os.fstat(self._file.fileno()).st_size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    async def chunks(self):
+        if self.is_path:
+            if self._file is None:
+                self._open_map()
+
+            if self._map is not None:
+                view = memoryview(self._map)
+                for idx in range(0, len(view), CHUNK_SIZE):
+                    yield view[idx : idx + CHUNK_SIZE]
+
+            return
+
+        if callable(self.source):
+            iterable = self.source()
+        elif self._consumed:
+            raise RuntimeError(
+                "Async iterables can only be uploaded once, pass a callable to allow retries."
+            )
+        else:
+            self._consumed = True
+            iterable = self.source
+
+        async for chunk in iterable:
+            yield chunk
+
+    def close(self):
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # a transport still holds a slice, the map goes with it
+                pass
+
+            self._map = None
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _file_size(file):
+    if isinstance(file, SlashFile):
+        return file.size
+
+    fp = file.fp
+    if not fp.seekable():
+        return None
+
+    file.reset()
+    end = fp.seek(0, os.SEEK_END)
+    file.reset()
+    return end - fp.tell()
+
+
+async def _read_chunks(file):
+    # discord.File, rewound on every attempt instead of being buffered
+    file.reset()
+    loop = asyncio.get_event_loop()
+    while chunk := await loop.run_in_executor(None, file.fp.read, CHUNK_SIZE):
+        yield chunk
+
+
+class _FilePayload(payload.Payload):
+    def __init__(self, file, size, body):
+        super().__init__(file, content_type="application/octet-stream")
+        self._size = size
+        self._body = body
+
+    async def write(self, writer):
+        file = self._value
+        chunks = file.chunks() if isinstance(file, SlashFile) else _read_chunks(file)
+        async for chunk in chunks:
+            if self._size is None:
+                self._body.streamed += len(chunk)
+                if self._body.streamed > self._body.budget:
+                    raise RuntimeError(
+                        f"Upload exceeds the {self._body.limit} byte limit."
+                    )
+
+            await writer.write(chunk)
+
+
+class _MultipartBody(aiohttp.MultipartWriter):
+    def __init__(self, limit, budget):
+        super().__init__("form-data")
+        self.limit = limit
+        self.budget = budget
+        self.streamed = 0
+
+    async def write(self, writer, close_boundary=True):
+        self.streamed = 0
+        await super().write(writer, close_boundary)
+
+
+def multipart_body(json, files, limit=DEFAULT_UPLOAD_LIMIT):
+    # sizes are checked up front, unsized streams are counted as they go
+    sizes = [_file_size(file) for file in files]
+    total = sum(size for size in sizes if size is not None)
+    if total > limit:
+        raise RuntimeError(f"Upload of {total} bytes exceeds the {limit} byte limit.")
+
+    body = _MultipartBody(limit, limit - total)
+    body.append_payload(
+        payload.StringPayload(utils.to_json(json))
+    ).set_content_disposition("form-data", name="payload_json")
+
+    multiple_files = len(files) > 1
+    for idx, (file, size) in enumerate(zip(files, sizes)):
+        body.append_payload(_FilePayload(file, size, body)).set_content_disposition(
+            "form-data",
+            name=f"file{idx if multiple_files else ''}",
+            filename=file.filename,
+        )
+
+    return body
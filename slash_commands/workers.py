@@ -0,0 +1,176 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+
+from discord import utils
+from discord.ext import commands
+
+from .bot_patcher import BotPatcher
+
+log = logging.getLogger(__name__)
+
+
+def _worker_main(queue, ready, extensions, token, application_id, options):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    bot = commands.Bot(command_prefix=lambda bot, message: [], loop=loop)
+    patcher = BotPatcher(bot, application_id=application_id, **options)
+    patcher.patch()
+    try:
+        loop.run_until_complete(_serve(patcher, queue, ready, extensions, token))
+    finally:
+        loop.close()
+
+
+async def _serve(patcher, queue, ready, extensions, token):
+    bot = patcher.bot
+    await bot.http.static_login(token, bot=True)
+    for extension in extensions:
+        bot.load_extension(extension)
+
+    ready.set()
+    in_flight = set()
+    while (payload := await bot.loop.run_in_executor(None, queue.get)) is not None:
+        task = bot.loop.create_task(patcher.handle_interaction(json.loads(payload)))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+
+    # retired, finish what's in flight before exiting; only the interactions,
+    # background tasks like admission's lag monitor never finish on their own
+    await asyncio.gather(*in_flight)
+    if bot.slash_admission is not None:
+        bot.slash_admission.close()
+
+    await bot.http.close()
+
+
+class _Worker:
+    def __init__(self, context, args):
+        self.queue = context.Queue()
+        # set once logged in with the extensions loaded
+        self.ready = context.Event()
+        self.process = context.Process(
+            target=_worker_main, args=(self.queue, self.ready, *args), daemon=True
+        )
+        self.process.start()
+
+    async def wait_ready(self, timeout):
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not self.ready.is_set():
+            if not self.process.is_alive():
+                raise RuntimeError(
+                    f"Worker exited with code {self.process.exitcode} while starting"
+                )
+
+            if asyncio.get_running_loop().time() > deadline:
+                self.process.kill()
+                raise RuntimeError(f"Worker wasn't ready after {timeout}s")
+
+            await asyncio.sleep(0.05)
+
+    def retire(self):
+        self.queue.put(None)
+
+
+class WorkerPool:
+    # the gateway process only forwards INTERACTION_CREATE payloads, the
+    # workers load the same extensions and respond over HTTP
+    def __init__(
+        self,
+        bot,
+        extensions,
+        *,
+        token,
+        processes=4,
+        application_id=None,
+        start_method="spawn",
+        ready_timeout=60.0,
+        check_interval=1.0,
+        **options,
+    ):
+        self.bot = bot
+        self.extensions = tuple(extensions)
+        self.token = token
+        self.processes = processes
+        self.application_id = application_id
+        self.ready_timeout = ready_timeout
+        self.check_interval = check_interval
+        # passed on to each worker's BotPatcher, so they have to be picklable,
+        # e.g. auto_defer=True, metrics=True, admission=True
+        self.options = options
+        self._context = multiprocessing.get_context(start_method)
+        self._workers = []
+        self._parser = None
+        self._monitor = None
+
+    def _spawn(self):
+        return _Worker(
+            self._context,
+            (
+                self.extensions,
+                self.token,
+                self.application_id or self.bot.user.id,
+                self.options,
+            ),
+        )
+
+    def start(self):
+        self._workers = [self._spawn() for _ in range(self.processes)]
+        parsers = self.bot._connection.parsers
+        self._parser = parsers["INTERACTION_CREATE"]
+        parsers["INTERACTION_CREATE"] = self.forward
+        self._monitor = self.bot.loop.create_task(self._watch())
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            for idx, worker in enumerate(self._workers):
+                if not worker.process.is_alive():
+                    # what it hadn't answered yet is lost, its queue's read
+                    # lock died with it
+                    log.warning(
+                        "Worker %d exited with code %s, respawning",
+                        idx,
+                        worker.process.exitcode,
+                    )
+                    self._workers[idx] = self._spawn()
+
+    def route(self, data):
+        # sticky by guild, so per-guild state in a worker stays put
+        key = utils._get_as_snowflake(data, "guild_id") or utils._get_as_snowflake(
+            data, "channel_id"
+        )
+        return (key or 0) % len(self._workers)
+
+    def forward(self, data):
+        self._workers[self.route(data)].queue.put(utils.to_json(data).encode())
+
+    async def reload(self):
+        # replace one worker at a time; the new one takes the slot's traffic
+        # once it's ready while the old one drains its queue and exits, and
+        # one that fails to start leaves the old one serving
+        for idx in range(len(self._workers)):
+            new = self._spawn()
+            await new.wait_ready(self.ready_timeout)
+            # looked up after the wait, the slot may have been respawned
+            old = self._workers[idx]
+            self._workers[idx] = new
+            old.retire()
+            await self.bot.loop.run_in_executor(None, old.process.join)
+
+    async def close(self):
+        if self._monitor is not None:
+            self._monitor.cancel()
+            self._monitor = None
+
+        if self._parser is not None:
+            self.bot._connection.parsers["INTERACTION_CREATE"] = self._parser
+            self._parser = None
+
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.retire()
+
+        for worker in workers:
+            await self.bot.loop.run_in_executor(None, worker.process.join)